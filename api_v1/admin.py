@@ -1,45 +1,65 @@
-import io
-import os
-import zipfile
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterator
 
 import requests
 
-from api_v1.baseapi import BaseApi
+from api_v1.baseapi import BaseApi, Endpoint
+from api_v1.cache import ResponseCache
+from api_v1.models import Schedule, User, Workflow
+from api_v1.packages import DEFAULT_CHUNK_SIZE, Package, save_package
+from api_v1.retry import RetryEngine
+from api_v1.session import GallerySession
+from api_v1.singleflight import SingleFlight
 from gallery_authentication import GalleryAuthenticationMethod
 from request_methods.methods import Method
 
 
 class Admin(BaseApi):
-    def __init__(self, base_url: str, authenticator: GalleryAuthenticationMethod):
-        super().__init__(base_url=base_url, authenticator=authenticator)
+    def __init__(self, base_url, authenticator: GalleryAuthenticationMethod, session: GallerySession = None,
+                 cache: ResponseCache = None, observers=None, retry: RetryEngine = None,
+                 single_flight: SingleFlight = None):
+        super().__init__(base_url=base_url, authenticator=authenticator, session=session, cache=cache,
+                         observers=observers, retry=retry, single_flight=single_flight)
 
-    def get_package(self, app_id: str) -> requests.Response:
+    def get_package(self, app_id: str, headers=None, stream=False) -> requests.Response:
         """
         Returns the app that was requested
         :param app_id: The id of the package to retrieve.
-        :return: Returns True when contents are saved
+        :param headers: An optional parameter denoting any headers you would like to pass to the request
+        :param stream: When True, the package is not downloaded until the response content is read
+        :return: A requests Response containing the package
         """
-        endpoint = f'admin/v1/{app_id}/package'
-        response = self._make_request(Method.GET.value, endpoint=endpoint)
+        endpoint = Endpoint('admin/v1/{app_id}/package', app_id=app_id)
+        response = self._make_request(Method.GET.value, endpoint=endpoint, headers=headers, stream=stream)
         return response
 
-    def get_package_and_save(self, app_id: str, save_path: str) -> bool:
+    def get_package_and_save(self, app_id: str, save_path: str, download_path: str = None,
+                             chunk_size: int = DEFAULT_CHUNK_SIZE, sha256: str = None) -> bool:
         """
         A helper method that wraps around the get_package call.  This method will retrieve
-        a package from the API and save it to a designated path
+        a package from the API and save it to a designated path.  The package is streamed to
+        a temporary file in chunks, so it is never held in memory as a whole.
         :param app_id: The id of the package to retrieve.
         :param save_path: A path representing where the package should be saved
+        :param download_path: An optional file path for the downloaded archive.  If a partial download exists there it is resumed.
+        :param chunk_size: The number of bytes read from the connection at a time
+        :param sha256: An optional hex digest the downloaded package must match
         :return: Returns True when contents are saved
         """
+        return save_package(self.get_package, app_id, save_path, download_path=download_path,
+                            chunk_size=chunk_size, sha256=sha256)
 
-        if not os.path.isdir(save_path):
-            raise NotADirectoryError
-
-        response = self.get_package(app_id=app_id)
-        zipped_package = zipfile.ZipFile(io.BytesIO(response.content))
-        zipped_package.extractall(save_path)
-
-        return True
+    def open_package(self, app_id: str, download_path: str = None, sha256: str = None) -> Package:
+        """
+        A helper method that wraps around the get_package call.  This method streams a package to disk and
+        opens it lazily, so single members can be listed, read or parsed without extracting the whole package
+        :param app_id: The id of the package to retrieve.
+        :param download_path: An optional file path for the downloaded archive.  If a partial download exists there it is resumed.
+        :param sha256: An optional hex digest the downloaded package must match
+        :return: A Package, which should be closed when no longer needed
+        """
+        return Package.download(self.get_package, app_id, download_path=download_path, sha256=sha256)
 
     def get_users(self, headers=None, params=None) -> requests.Response:
         """
@@ -52,6 +72,16 @@ class Admin(BaseApi):
         response = self._make_request(Method.GET.value, endpoint=endpoint, headers=headers, params=params)
         return response
 
+    def iter_users(self, model=User, headers=None, params=None) -> Iterator:
+        """
+        Streams the users in a Gallery, parsing the response incrementally and yielding one record at a time
+        :param model: The Record subclass each entry is converted to, or None to yield dictionaries
+        :param headers: An optional parameter denoting any headers you would like to pass to the request
+        :param params: An optional parameter denoting any parameters you would like to pass to the request
+        :return: A generator of records
+        """
+        return self._iter_records('admin/v1/users', model=model, headers=headers, params=params)
+
     def get_schedules(self, headers=None, params=None) -> requests.Response:
         """
         Finds schedules in a Gallery
@@ -63,6 +93,16 @@ class Admin(BaseApi):
         response = self._make_request(Method.GET.value, endpoint=endpoint, headers=headers, params=params)
         return response
 
+    def iter_schedules(self, model=Schedule, headers=None, params=None) -> Iterator:
+        """
+        Streams the schedules in a Gallery, parsing the response incrementally and yielding one record at a time
+        :param model: The Record subclass each entry is converted to, or None to yield dictionaries
+        :param headers: An optional parameter denoting any headers you would like to pass to the request
+        :param params: An optional parameter denoting any parameters you would like to pass to the request
+        :return: A generator of records
+        """
+        return self._iter_records('admin/v1/schedules', model=model, headers=headers, params=params)
+
     def get_collections(self, headers=None, params=None) -> requests.Response:
         """
         Finds collections in a Gallery
@@ -141,6 +181,48 @@ class Admin(BaseApi):
         response = self._make_request(Method.GET.value, endpoint=endpoint, headers=headers, params=params)
         return response
 
+    def iter_audit_log(self, entity: str, page_size: int = 100, start_page: int = 1, prefetch: int = 2,
+                       on_page_done: Callable[[int], None] = None, model=None, headers=None) -> Iterator:
+        """
+        Iterates over every audit log entry for a given entity type, fetching the next pages in the background
+        while the current one is being consumed.  Iteration stops after the first page holding fewer than page_size entries.
+        :param entity: The entity type to retrieve audit log entries for
+        :param page_size: The number of entries requested per page
+        :param start_page: The page to start from, e.g. a cursor saved by on_page_done during an earlier run
+        :param prefetch: The number of pages requested ahead of the page being consumed
+        :param on_page_done: An optional callback receiving the page to resume from once a page has been fully consumed
+        :param model: An optional Record subclass, e.g. AuditEntry, each entry is converted to
+        :param headers: An optional parameter denoting any headers you would like to pass to the request
+        :return: A generator of audit log entries
+        """
+        def fetch_page(page: int) -> list:
+            response = self.get_audit_log(entity=entity, page=page, page_size=page_size, headers=headers)
+            response.raise_for_status()
+            return response.json()
+
+        executor = ThreadPoolExecutor(max_workers=max(1, prefetch))
+        pending = deque()
+        next_page = start_page
+        try:
+            while True:
+                while len(pending) <= prefetch:
+                    pending.append((next_page, executor.submit(fetch_page, next_page)))
+                    next_page += 1
+
+                page, future = pending.popleft()
+                entries = future.result()
+                if model is None:
+                    yield from entries
+                else:
+                    yield from (model.from_json(entry) for entry in entries)
+
+                if on_page_done is not None:
+                    on_page_done(page + 1)
+                if len(entries) < page_size:
+                    return
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
     def get_workflow_jobs(self, headers=None, params=None) -> requests.Response:
         """
         Returns the last run job and its current state for workflows
@@ -152,6 +234,16 @@ class Admin(BaseApi):
         response = self._make_request(Method.GET.value, endpoint=endpoint, headers=headers, params=params)
         return response
 
+    def iter_workflow_jobs(self, model=None, headers=None, params=None) -> Iterator:
+        """
+        Streams the last run job and its current state for workflows, parsing the response incrementally and yielding one record at a time
+        :param model: The Record subclass each entry is converted to, or None to yield dictionaries
+        :param headers: An optional parameter denoting any headers you would like to pass to the request
+        :param params: An optional parameter denoting any parameters you would like to pass to the request
+        :return: A generator of records
+        """
+        return self._iter_records('admin/v1/workflows/jobs', model=model, headers=headers, params=params)
+
     def get_all_workflows(self, headers=None, params=None) -> requests.Response:
         """
         Return all workflows, optionally filtered by date
@@ -163,6 +255,16 @@ class Admin(BaseApi):
         response = self._make_request(Method.GET.value, endpoint=endpoint, headers=headers, params=params)
         return response
 
+    def iter_all_workflows(self, model=Workflow, headers=None, params=None) -> Iterator:
+        """
+        Streams all workflows, optionally filtered by date, parsing the response incrementally and yielding one record at a time
+        :param model: The Record subclass each entry is converted to, or None to yield dictionaries
+        :param headers: An optional parameter denoting any headers you would like to pass to the request
+        :param params: An optional parameter denoting any parameters you would like to pass to the request
+        :return: A generator of records
+        """
+        return self._iter_records('admin/v1/workflows/all', model=model, headers=headers, params=params)
+
     def get_workflows(self, headers=None, params=None) -> requests.Response:
         """
         Finds workflows in a Gallery
@@ -174,6 +276,16 @@ class Admin(BaseApi):
         response = self._make_request(Method.GET.value, endpoint=endpoint, headers=headers, params=params)
         return response
 
+    def iter_workflows(self, model=Workflow, headers=None, params=None) -> Iterator:
+        """
+        Streams the workflows in a Gallery, parsing the response incrementally and yielding one record at a time
+        :param model: The Record subclass each entry is converted to, or None to yield dictionaries
+        :param headers: An optional parameter denoting any headers you would like to pass to the request
+        :param params: An optional parameter denoting any parameters you would like to pass to the request
+        :return: A generator of records
+        """
+        return self._iter_records('admin/v1/workflows', model=model, headers=headers, params=params)
+
     def post_workflows(self, headers=None, params=None) -> requests.Response:
         """
         Publishes a YXZP to the system
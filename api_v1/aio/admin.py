@@ -0,0 +1,183 @@
+from api_v1.aio.baseapi import AsyncBaseApi
+from api_v1.aio.session import AsyncGallerySession, AsyncResponse
+from api_v1.singleflight import AsyncSingleFlight
+from gallery_authentication import GalleryAuthenticationMethod
+from request_methods.methods import Method
+
+
+class AsyncAdmin(AsyncBaseApi):
+    def __init__(self, base_url: str, authenticator: GalleryAuthenticationMethod, session: AsyncGallerySession = None,
+                 single_flight: AsyncSingleFlight = None):
+        super().__init__(base_url=base_url, authenticator=authenticator, session=session,
+                         single_flight=single_flight)
+
+    async def get_package(self, app_id: str) -> AsyncResponse:
+        """
+        Returns the app that was requested
+        :param app_id: The id of the package to retrieve.
+        :return: Returns True when contents are saved
+        """
+        endpoint = f'admin/v1/{app_id}/package'
+        response = await self._make_request(Method.GET.value, endpoint=endpoint)
+        return response
+
+    async def get_package_and_save(self, app_id: str, save_path: str) -> bool:
+        """
+        A helper method that wraps around the get_package call.  This method will retrieve
+        a package from the API and save it to a designated path
+        :param app_id: The id of the package to retrieve.
+        :param save_path: A path representing where the package should be saved
+        :return: Returns True when contents are saved
+        """
+        return await self._get_package_and_save(self.get_package, app_id, save_path)
+
+    async def get_users(self, headers=None, params=None) -> AsyncResponse:
+        """
+        Finds users in a Gallery
+        :param headers: An optional parameter denoting any headers you would like to pass to the request
+        :param params: An optional parameter denoting any parameters you would like to pass to the request
+        :return: An AsyncResponse (application/json) by default unless specified otherwise in the header
+        """
+        endpoint = 'admin/v1/users'
+        response = await self._make_request(Method.GET.value, endpoint=endpoint, headers=headers, params=params)
+        return response
+
+    async def get_schedules(self, headers=None, params=None) -> AsyncResponse:
+        """
+        Finds schedules in a Gallery
+        :param headers: An optional parameter denoting any headers you would like to pass to the request
+        :param params: An optional parameter denoting any parameters you would like to pass to the request
+        :return: An AsyncResponse (application/json) by default unless specified otherwise in the header
+        """
+        endpoint = 'admin/v1/schedules'
+        response = await self._make_request(Method.GET.value, endpoint=endpoint, headers=headers, params=params)
+        return response
+
+    async def get_collections(self, headers=None, params=None) -> AsyncResponse:
+        """
+        Finds collections in a Gallery
+        :param headers: An optional parameter denoting any headers you would like to pass to the request
+        :param params: An optional parameter denoting any parameters you would like to pass to the request
+        :return: An AsyncResponse (application/json) by default unless specified otherwise in the header
+        """
+        endpoint = 'admin/v1/collections'
+        response = await self._make_request(Method.GET.value, endpoint=endpoint, headers=headers, params=params)
+        return response
+
+    async def get_subscriptions(self, headers=None, params=None) -> AsyncResponse:
+        """
+        Find subscriptions in a Gallery
+        :param headers: An optional parameter denoting any headers you would like to pass to the request
+        :param params: An optional parameter denoting any parameters you would like to pass to the request
+        :return: An AsyncResponse (application/json) by default unless specified otherwise in the header
+        """
+        endpoint = 'admin/v1/subscriptions'
+        response = await self._make_request(Method.GET.value, endpoint=endpoint, headers=headers, params=params)
+        return response
+
+    async def get_server_data_connections(self, headers=None, params=None) -> AsyncResponse:
+        """
+        Returns data connections created in a private Gallery
+        :param headers: An optional parameter denoting any headers you would like to pass to the request
+        :param params: An optional parameter denoting any parameters you would like to pass to the request
+        :return: An AsyncResponse (application/json) by default unless specified otherwise in the header
+        """
+        endpoint = 'admin/v1/serverdataconnections'
+        response = await self._make_request(Method.GET.value, endpoint=endpoint, headers=headers, params=params)
+        return response
+
+    async def get_system_data_connections(self, headers=None, params=None) -> AsyncResponse:
+        """
+        Returns system data connections created on the server where Alteryx Server is installed
+        :param headers: An optional parameter denoting any headers you would like to pass to the request
+        :param params: An optional parameter denoting any parameters you would like to pass to the request
+        :return: An AsyncResponse (application/json) by default unless specified otherwise in the header
+        """
+        endpoint = 'admin/v1/systemdataconnections'
+        response = await self._make_request(Method.GET.value, endpoint=endpoint, headers=headers, params=params)
+        return response
+
+    async def get_insights(self, headers=None, params=None) -> AsyncResponse:
+        """
+        Finds insights in a Gallery
+        :param headers: An optional parameter denoting any headers you would like to pass to the request
+        :param params: An optional parameter denoting any parameters you would like to pass to the request
+        :return: An AsyncResponse (application/json) by default unless specified otherwise in the header
+        """
+        endpoint = 'admin/v1/insights'
+        response = await self._make_request(Method.GET.value, endpoint=endpoint, headers=headers, params=params)
+        return response
+
+    async def get_migratable_workflows(self, subscription_id: str, headers=None) -> AsyncResponse:
+        """
+        Finds workflows in a Gallery that have been marked ready for migration
+        :param subscription_id: The id of the subscription to search for migratable workflows
+        :param headers: An optional parameter denoting any headers you would like to pass to the request
+        :return: An AsyncResponse (application/json) by default unless specified otherwise in the header
+        """
+        params = {'subscriptionId': subscription_id}
+        endpoint = 'admin/v1/workflows/migratable'
+        response = await self._make_request(Method.GET.value, endpoint=endpoint, headers=headers, params=params)
+        return response
+
+    async def get_audit_log(self, entity: str, page: int, page_size: int,  headers=None) -> AsyncResponse:
+        """
+        Retrieve audit log entries for a given entity type
+        :param headers: An optional parameter denoting any headers you would like to pass to the request
+        :return: An AsyncResponse (application/json) by default unless specified otherwise in the header
+        """
+        params = {'entity': entity, 'page': page, 'pageSize': page_size}
+        endpoint = 'admin/v1/auditlog'
+        response = await self._make_request(Method.GET.value, endpoint=endpoint, headers=headers, params=params)
+        return response
+
+    async def get_workflow_jobs(self, headers=None, params=None) -> AsyncResponse:
+        """
+        Returns the last run job and its current state for workflows
+        :param headers: An optional parameter denoting any headers you would like to pass to the request
+        :param params: An optional parameter denoting any parameters you would like to pass to the request
+        :return: An AsyncResponse (application/json) by default unless specified otherwise in the header
+        """
+        endpoint = 'admin/v1/workflows/jobs'
+        response = await self._make_request(Method.GET.value, endpoint=endpoint, headers=headers, params=params)
+        return response
+
+    async def get_all_workflows(self, headers=None, params=None) -> AsyncResponse:
+        """
+        Return all workflows, optionally filtered by date
+        :param headers: An optional parameter denoting any headers you would like to pass to the request
+        :param params: An optional parameter denoting any parameters you would like to pass to the request
+        :return: An AsyncResponse (application/json) by default unless specified otherwise in the header
+        """
+        endpoint = 'admin/v1/workflows/all'
+        response = await self._make_request(Method.GET.value, endpoint=endpoint, headers=headers, params=params)
+        return response
+
+    async def get_workflows(self, headers=None, params=None) -> AsyncResponse:
+        """
+        Finds workflows in a Gallery
+        :param headers: An optional parameter denoting any headers you would like to pass to the request
+        :param params: An optional parameter denoting any parameters you would like to pass to the request
+        :return: An AsyncResponse (application/json) by default unless specified otherwise in the header
+        """
+        endpoint = 'admin/v1/workflows'
+        response = await self._make_request(Method.GET.value, endpoint=endpoint, headers=headers, params=params)
+        return response
+
+    async def post_workflows(self, headers=None, params=None) -> AsyncResponse:
+        """
+        Publishes a YXZP to the system
+        :param headers: An optional parameter denoting any headers you would like to pass to the request
+        :param params: An optional parameter denoting any parameters you would like to pass to the request
+        :return: An AsyncResponse (application/json) by default unless specified otherwise in the header
+        """
+        raise NotImplementedError
+
+    async def put_migration_flag(self, headers=None, params=None) -> AsyncResponse:
+        """
+        Updates an App's ready for migration flag
+        :param headers: An optional parameter denoting any headers you would like to pass to the request
+        :param params: An optional parameter denoting any parameters you would like to pass to the request
+        :return: An AsyncResponse (application/json) by default unless specified otherwise in the header
+        """
+        raise NotImplementedError
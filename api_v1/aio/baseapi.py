@@ -0,0 +1,75 @@
+import asyncio
+import os
+
+import requests
+
+from api_v1.aio.session import AsyncGallerySession, AsyncResponse
+from api_v1.baseapi import CONDITIONAL_HEADERS
+from api_v1.cache import request_key
+from api_v1.packages import extract_package
+from api_v1.singleflight import AsyncSingleFlight
+from gallery_authentication import GalleryAuthenticationMethod
+from request_methods.methods import Method
+
+
+class AsyncBaseApi:
+    def __init__(self, base_url: str, authenticator: GalleryAuthenticationMethod, session: AsyncGallerySession = None,
+                 single_flight: AsyncSingleFlight = None):
+        """
+        :param base_url: The base URL of your Gallery API as defined in your server settings
+        :param authenticator: A GalleryAuthenticationMethod object, ideally an AsyncOAuth2 so token refreshes do not block the loop
+        :param session: An optional AsyncGallerySession to share a connection pool and concurrency bound between API objects.
+        When omitted, the API object creates and owns its own session, which is closed by close() or on leaving an async with block.
+        :param single_flight: An optional AsyncSingleFlight that lets identical concurrent GET requests share one round trip
+        """
+        self._base_url = base_url
+        self._authenticator = authenticator
+        # Coalesced responses are only shared between API objects using the same Gallery and credential
+        self._scope = (base_url, authenticator.identity)
+        self._owns_session = session is None
+        self._session = session if session is not None else AsyncGallerySession()
+        self._single_flight = single_flight
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    async def close(self) -> None:
+        """
+        Closes the connection pool if this object owns it.  A shared AsyncGallerySession is left open for its owner.
+        :return: None
+        """
+        if self._owns_session:
+            await self._session.close()
+
+    async def _get_package_and_save(self, get_package, app_id: str, save_path: str) -> bool:
+        if not os.path.isdir(save_path):
+            raise NotADirectoryError
+
+        response = await get_package(app_id=app_id)
+        response.raise_for_status()
+        # Extraction is blocking disk work, so it runs in the default executor instead of on the loop
+        await asyncio.get_running_loop().run_in_executor(None, extract_package, response.body, save_path)
+        return True
+
+    async def _make_request(self, method: Method, endpoint, headers={}, params={}, body=None) -> AsyncResponse:
+        if self._single_flight is None or method != Method.GET.value:
+            return await self._send(method, endpoint, headers=headers, params=params, body=body)
+
+        validators = tuple((headers or {}).get(name) for name in CONDITIONAL_HEADERS)
+        key = (validators,) + request_key(method, endpoint, params=params, headers=headers, scope=self._scope)
+        response, _ = await self._single_flight.do(
+            key, lambda: self._send(method, endpoint, headers=headers, params=params, body=body))
+        return response
+
+    async def _send(self, method: Method, endpoint, headers=None, params=None, body=None) -> AsyncResponse:
+        url = f'{self._base_url}/{endpoint}'
+        # requests is only used to authenticate and encode the request; aiohttp sends it
+        api_request = requests.Request(method=method, url=url, headers=headers, params=params, data=body)
+        authed_api_request = await self._authenticator.authenticate_async(api_request, self._session)
+        prepared_request = authed_api_request.prepare()
+        response = await self._session.send(prepared_request.method, prepared_request.url,
+                                            headers=dict(prepared_request.headers), body=prepared_request.body)
+        return response
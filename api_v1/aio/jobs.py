@@ -0,0 +1,45 @@
+from api_v1.aio.baseapi import AsyncBaseApi
+from api_v1.aio.session import AsyncGallerySession, AsyncResponse
+from api_v1.singleflight import AsyncSingleFlight
+from gallery_authentication import GalleryAuthenticationMethod
+from request_methods.methods import Method
+
+
+class AsyncJobs(AsyncBaseApi):
+    def __init__(self, base_url: str, authenticator: GalleryAuthenticationMethod, session: AsyncGallerySession = None,
+                 single_flight: AsyncSingleFlight = None):
+        """
+        The AsyncJobs class is the asyncio counterpart of Jobs and represents the jobs endpoint and all the methods associated with it
+        :param base_url: The base URL of your Gallery API as defined in your server settings
+        :param authenticator: A GalleryAuthenticationMethod object representing the method for authentication to your Gallery instance (e.g. Oauth1 or Oauth2)
+        :param session: An optional AsyncGallerySession used to share a connection pool and concurrency bound between API objects
+        :param single_flight: An optional AsyncSingleFlight that lets identical concurrent GET requests share one round trip
+        """
+        super().__init__(base_url=base_url, authenticator=authenticator, session=session,
+                         single_flight=single_flight)
+
+    async def get_job(self, job_id: str, headers=None, params=None) -> AsyncResponse:
+        """
+        Retrieves the job and its current state
+        :param job_id: The id representing the job
+        :param headers: An optional parameter denoting any headers you would like to pass to the request
+        :param params: An optional parameter denoting any parameters you would like to pass to the request
+        :return:
+        """
+        endpoint = f'v1/jobs/{job_id}'
+        response = await self._make_request(Method.GET.value, endpoint=endpoint, headers=headers, params=params)
+        return response
+
+    async def get_job_output(self, job_id: str, output_id: str, headers=None, params=None) -> AsyncResponse:
+        """
+        Get output for a given job.  It is important to pass the 'format' parameter as a param.  The consumer
+        of the api is responsible for writing the raw content to a file.
+        :param job_id: The id representing the job.
+        :param output_id: The id representing the particular output to retrieve.
+        :param headers: An optional parameter denoting any headers you would like to pass to the request
+        :param params: An optional parameter denoting any parameters you would like to pass to the request
+        :return: An AsyncResponse containing the contents being retrieved
+        """
+        endpoint = f'v1/jobs/{job_id}/output/{output_id}'
+        response = await self._make_request(Method.GET.value, endpoint=endpoint, headers=headers, params=params)
+        return response
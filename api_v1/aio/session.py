@@ -0,0 +1,107 @@
+import asyncio
+import json
+
+import aiohttp
+from yarl import URL
+
+
+class AsyncResponse:
+    """
+    A fully read response.  aiohttp releases a response once its connection goes back to the pool, after which its
+    body can no longer be read, so the status, headers and body are kept here instead and can be read any number of times.
+    """
+
+    def __init__(self, response: aiohttp.ClientResponse, body: bytes):
+        self.method = response.method
+        self.url = response.url
+        self.status = response.status
+        self.reason = response.reason
+        self.headers = response.headers
+        self.content_type = response.content_type
+        self.charset = response.charset
+        self.request_info = response.request_info
+        self.history = response.history
+        self.body = body
+
+    @property
+    def ok(self) -> bool:
+        return self.status < 400
+
+    def raise_for_status(self) -> None:
+        if not self.ok:
+            raise aiohttp.ClientResponseError(self.request_info, self.history, status=self.status,
+                                              message=self.reason, headers=self.headers)
+
+    async def read(self) -> bytes:
+        return self.body
+
+    async def text(self, encoding: str = None, errors: str = 'strict') -> str:
+        return self.body.decode(encoding or self.charset or 'utf-8', errors)
+
+    async def json(self, encoding: str = None, loads=json.loads, content_type: str = 'application/json'):
+        # Mirrors aiohttp, which refuses to parse a body of another content type unless content_type is None
+        if content_type is not None and content_type not in self.content_type:
+            raise aiohttp.ContentTypeError(self.request_info, self.history, status=self.status,
+                                           message=f'Attempt to decode JSON with unexpected mimetype: {self.content_type}',
+                                           headers=self.headers)
+        return loads(await self.text(encoding=encoding))
+
+
+class AsyncGallerySession:
+    def __init__(self, pool_size: int = 100, limit_per_host: int = 0, max_concurrency: int = 100,
+                 timeout: float = None, keep_alive: bool = True):
+        """
+        The AsyncGallerySession object owns a single aiohttp connection pool and a concurrency bound that can be
+        shared by any number of AsyncAdmin, AsyncJobs and AsyncWorkflows instances running on one event loop.
+        :param pool_size: The total number of connections kept in the pool
+        :param limit_per_host: The maximum number of connections per host, 0 meaning no per-host limit
+        :param max_concurrency: The maximum number of requests allowed in flight at once
+        :param timeout: A default total timeout in seconds applied to every request
+        :param keep_alive: When False, connections are closed after every request
+        """
+        self._pool_size = pool_size
+        self._limit_per_host = limit_per_host
+        self._max_concurrency = max_concurrency
+        self._timeout = timeout
+        self._keep_alive = keep_alive
+        self._client_session = None
+        self._semaphore = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    def _get_client_session(self) -> aiohttp.ClientSession:
+        # The aiohttp session and semaphore must be created inside the running event loop
+        if self._client_session is None or self._client_session.closed:
+            connector = aiohttp.TCPConnector(limit=self._pool_size, limit_per_host=self._limit_per_host,
+                                             force_close=not self._keep_alive)
+            self._client_session = aiohttp.ClientSession(connector=connector,
+                                                         timeout=aiohttp.ClientTimeout(total=self._timeout))
+            self._semaphore = asyncio.Semaphore(self._max_concurrency)
+        return self._client_session
+
+    async def send(self, method: str, url: str, headers=None, body=None) -> AsyncResponse:
+        """
+        Sends a request over the pooled connections, waiting for a free slot when max_concurrency is reached.
+        The body is read before the connection is released, so the response can be consumed after returning.
+        :param method: The HTTP method of the request
+        :param url: The fully qualified, already encoded url, including any query string
+        :param headers: An optional dictionary of headers
+        :param body: An optional request body
+        :return: An AsyncResponse holding the status, headers and body
+        """
+        client_session = self._get_client_session()
+        async with self._semaphore:
+            async with client_session.request(method, URL(url, encoded=True), headers=headers, data=body) as response:
+                return AsyncResponse(response, await response.read())
+
+    async def close(self) -> None:
+        """
+        Closes every pooled connection.  Safe to call more than once.
+        :return: None
+        """
+        if self._client_session is not None and not self._client_session.closed:
+            await self._client_session.close()
@@ -0,0 +1,94 @@
+import json
+
+from api_v1.aio.baseapi import AsyncBaseApi
+from api_v1.aio.session import AsyncGallerySession, AsyncResponse
+from api_v1.singleflight import AsyncSingleFlight
+from api_v1.workflows import _build_questions_list
+from gallery_authentication.gallery_authentication_method import GalleryAuthenticationMethod
+from request_methods.methods import Method
+
+
+class AsyncWorkflows(AsyncBaseApi):
+    def __init__(self, base_url: str, authenticator: GalleryAuthenticationMethod, session: AsyncGallerySession = None,
+                 single_flight: AsyncSingleFlight = None):
+        """
+        The AsyncWorkflows class is the asyncio counterpart of Workflows and represents the workflow endpoint and all the methods associated with it
+        :param base_url: The base URL of your Gallery API as defined in your server settings
+        :param authenticator: A GalleryAuthenticationMethod object representing the method for authentication to your Gallery instance (e.g. Oauth1 or Oauth2)
+        :param session: An optional AsyncGallerySession used to share a connection pool and concurrency bound between API objects
+        :param single_flight: An optional AsyncSingleFlight that lets identical concurrent GET requests share one round trip
+        """
+        super().__init__(base_url=base_url, authenticator=authenticator, session=session,
+                         single_flight=single_flight)
+
+    async def get_subscription(self, headers=None, params=None) -> AsyncResponse:
+        """
+        Finds workflows in a subscription
+        :param headers: An optional parameter denoting any headers you would like to pass to the request
+        :param params: An optional parameter denoting any parameters you would like to pass to the request
+        :return: An AsyncResponse (application/json) by default unless specified otherwise in the header
+        """
+        endpoint = 'v1/workflows/subscription'
+        response = await self._make_request(Method.GET.value, endpoint=endpoint, headers=headers, params=params)
+        return response
+
+    async def post_jobs(self, app_id: str, questions={}, headers=None) -> AsyncResponse:
+        """
+        Queues a job execution for the specified workflow with the supplied answers
+        :param app_id: The id for the workflow to execute.
+        :param questions: A dictionary representing the list of questions and answers to execute the workflow with.
+        :param headers: An optional parameter denoting any headers you would like to pass to the request
+        :return: An AsyncResponse (application/json) by default unless specified otherwise in the header
+        """
+        endpoint = f'v1/workflows/{app_id}/jobs'
+        questions = _build_questions_list(questions=questions)
+        questions = json.dumps(questions)
+        headers = dict(headers or {})
+        headers['Content-Type'] = 'application/json'
+        response = await self._make_request(Method.POST.value, endpoint=endpoint, headers=headers, body=questions)
+        return response
+
+    async def get_jobs(self, app_id: str, headers=None, params=None) -> AsyncResponse:
+        """
+        Returns the jobs for the given Alteryx Analytics App
+        :param app_id: The id for the workflow to get jobs for.
+        :param headers: An optional parameter denoting any headers you would like to pass to the request
+        :param params: An optional parameter denoting any parameters you would like to pass to the request
+        :return: An AsyncResponse (application/json) by default unless specified otherwise in the header
+        """
+        endpoint = f'v1/workflows/{app_id}/jobs'
+        response = await self._make_request(Method.GET.value, endpoint=endpoint, headers=headers, params=params)
+        return response
+
+    async def get_questions(self, app_id: str, headers=None, params=None) -> AsyncResponse:
+        """
+        Get the questions for the given Alteryx Analytics App
+        :param app_id: The id for the workflow to get questions for.
+        :param headers: An optional parameter denoting any headers you would like to pass to the request
+        :param params: An optional parameter denoting any parameters you would like to pass to the request
+        :return: An AsyncResponse (application/json) by default unless specified otherwise in the header
+        """
+        endpoint = f'v1/workflows/{app_id}/questions'
+        response = await self._make_request(Method.GET.value, endpoint=endpoint, headers=headers, params=params)
+        return response
+
+    async def get_package(self, app_id) -> AsyncResponse:
+        """
+        Returns the app that was requested
+        :param app_id: The id of the package to retrieve.
+        :return: Returns True when contents are saved
+        """
+        endpoint = f'/v1/workflows/{app_id}/package'
+
+        response = await self._make_request(Method.GET.value, endpoint=endpoint)
+        return response
+
+    async def get_package_and_save(self, app_id: str, save_path: str) -> bool:
+        """
+        A helper method that wraps around the get_package call.  This method will retrieve
+        a package from the API and save it to a designated path
+        :param app_id: The id of the package to retrieve.
+        :param save_path: A path representing where the package should be saved
+        :return: Returns True when contents are saved
+        """
+        return await self._get_package_and_save(self.get_package, app_id, save_path)
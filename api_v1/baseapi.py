@@ -1,18 +1,200 @@
+import time
+
 import requests
 
+from api_v1.cache import ResponseCache, request_key
+from api_v1.models import iter_records
+from api_v1.instrumentation import RequestEvent, RequestObserver, notify_observers
+from api_v1.nodes import NodePool
+from api_v1.retry import RetryEngine
+from api_v1.session import GallerySession
+from api_v1.singleflight import SingleFlight
 from gallery_authentication import GalleryAuthenticationMethod
 from request_methods.methods import Method
 
+CONDITIONAL_HEADERS = ('If-None-Match', 'If-Modified-Since')
+
+
+class Endpoint(str):
+    """
+    An endpoint string that remembers the template it was built from, so requests to e.g. 'v1/jobs/{job_id}'
+    can be grouped regardless of the job id
+    """
+
+    def __new__(cls, template: str, **values):
+        endpoint = super().__new__(cls, template.format(**values))
+        endpoint.template = template
+        return endpoint
+
+
+def endpoint_template(endpoint) -> str:
+    return getattr(endpoint, 'template', endpoint).strip('/')
+
 
 class BaseApi:
-    def __init__(self, base_url: str, authenticator: GalleryAuthenticationMethod):
-        self._base_url = base_url
+    def __init__(self, base_url, authenticator: GalleryAuthenticationMethod, session: GallerySession = None,
+                 cache: ResponseCache = None, observers=None, retry: RetryEngine = None,
+                 single_flight: SingleFlight = None):
+        """
+        :param base_url: The base URL of your Gallery API as defined in your server settings.  A list of base URLs or
+        a NodePool spreads the requests across several Gallery nodes.
+        :param authenticator: A GalleryAuthenticationMethod object representing the method for authentication to your Gallery instance (e.g. Oauth1 or Oauth2)
+        :param session: An optional GallerySession to share a connection pool between API objects.  When omitted,
+        the API object creates and owns its own pool, which is closed by close() or on leaving a with block.
+        :param cache: An optional ResponseCache used for GET requests.  Other methods invalidate related entries.
+        :param observers: An optional list of RequestObserver objects (e.g. a MetricsCollector) notified of every request
+        :param retry: An optional RetryEngine that retries idempotent requests on throttling and server errors,
+        adapts concurrency to the server and stops calling it while it keeps failing
+        :param single_flight: An optional SingleFlight that lets identical concurrent GET requests share one round trip
+        """
+        if isinstance(base_url, str):
+            self._nodes = None
+        else:
+            self._nodes = base_url if isinstance(base_url, NodePool) else NodePool(base_url)
+        self._base_url = base_url if self._nodes is None else self._nodes
         self._authenticator = authenticator
+        # Cached and coalesced responses are only shared between API objects using the same Gallery and credential
+        self._scope = (self._base_url, authenticator.identity)
+        self._owns_session = session is None
+        self._session = session if session is not None else GallerySession()
+        self._cache = cache
+        self._observers = list(observers or [])
+        self._retry = retry
+        self._single_flight = single_flight
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def add_observer(self, observer: RequestObserver) -> None:
+        """
+        Registers an observer that is notified of every request made by this object
+        :param observer: A RequestObserver, e.g. a MetricsCollector
+        :return: None
+        """
+        self._observers.append(observer)
+
+    def close(self) -> None:
+        """
+        Closes the connection pool if this object owns it.  A shared GallerySession is left open for its owner.
+        :return: None
+        """
+        if self._owns_session:
+            self._session.close()
+
+    def _make_request(self, method: Method, endpoint, headers={}, params={}, body=None, stream=False) -> requests.Response:
+        if not self._observers:
+            return self._cached_request(method, endpoint, headers=headers, params=params, body=body, stream=stream)
+
+        event = RequestEvent(method=method, template=endpoint_template(endpoint), endpoint=str(endpoint))
+        started = time.perf_counter()
+        try:
+            response = self._cached_request(method, endpoint, headers=headers, params=params, body=body,
+                                            stream=stream, event=event)
+            event.status_code = response.status_code
+            return response
+        except Exception as error:
+            event.error = error
+            raise
+        finally:
+            event.elapsed = time.perf_counter() - started
+            notify_observers(self._observers, event)
+
+    def _iter_records(self, endpoint, model=None, headers=None, params=None):
+        # Streams a JSON array response and parses it one record at a time
+        response = self._make_request(Method.GET.value, endpoint=endpoint, headers=headers, params=params, stream=True)
+        response.raise_for_status()
+        return iter_records(response, model=model)
+
+    def _cached_request(self, method: Method, endpoint, headers=None, params=None, body=None, stream=False,
+                        event: RequestEvent = None) -> requests.Response:
+        if self._cache is None or stream:
+            return self._coalesced_send(method, endpoint, headers=headers, params=params, body=body, stream=stream, event=event)
 
-    def _make_request(self, method: Method, endpoint, headers={}, params={}, body=None) -> requests.Response:
-        url = f'{self._base_url}/{endpoint}'
+        if method != Method.GET.value:
+            try:
+                return self._coalesced_send(method, endpoint, headers=headers, params=params, body=body, event=event)
+            finally:
+                self._cache.invalidate(endpoint)
+
+        # A caller revalidating its own copy expects the server's answer, which may be an empty 304
+        conditional = any(str(name).title() in CONDITIONAL_HEADERS for name in (headers or {}))
+        if conditional or self._cache.ttl_for(endpoint) <= 0:
+            return self._coalesced_send(method, endpoint, headers=headers, params=params, body=body, event=event)
+
+        key = request_key(method, endpoint, params=params, headers=headers, scope=self._scope)
+        entry = self._cache.get(key)
+        if entry is not None and entry.fresh:
+            if event is not None:
+                event.cached = True
+            return entry.response
+
+        if entry is not None and entry.validators:
+            headers = {**(headers or {}), **entry.validators}
+
+        response = self._coalesced_send(method, endpoint, headers=headers, params=params, body=body, event=event)
+        if entry is not None and response.status_code == 304:
+            self._cache.refresh(key)
+            return entry.response
+
+        self._cache.put(key, response)
+        return response
+
+    def _coalesced_send(self, method: Method, endpoint, headers=None, params=None, body=None, stream=False,
+                        event: RequestEvent = None) -> requests.Response:
+        if self._single_flight is None or stream or method != Method.GET.value:
+            return self._send(method, endpoint, headers=headers, params=params, body=body, stream=stream, event=event)
+
+        # Requests are only coalesced with requests to the same Gallery, with the same credential and validators
+        validators = tuple((headers or {}).get(name) for name in CONDITIONAL_HEADERS)
+        key = (validators,) + request_key(method, endpoint, params=params, headers=headers, scope=self._scope)
+        response, shared = self._single_flight.do(
+            key, lambda: self._send(method, endpoint, headers=headers, params=params, body=body, event=event))
+        if shared and event is not None:
+            event.coalesced = True
+        return response
+
+    def _send(self, method: Method, endpoint, headers=None, params=None, body=None, stream=False,
+              event: RequestEvent = None) -> requests.Response:
+        def send_once(base_url: str, authenticator: GalleryAuthenticationMethod) -> requests.Response:
+            return self._send_once(method, endpoint, headers=headers, params=params, body=body, stream=stream,
+                                   event=event, base_url=base_url, authenticator=authenticator)
+
+        if self._nodes is None:
+            if self._retry is None:
+                return send_once(self._base_url, self._authenticator)
+            return self._retry.call(self._base_url, method, lambda: send_once(self._base_url, self._authenticator),
+                                    event=event)
+
+        def send_to(node) -> requests.Response:
+            authenticator = node.authenticator or self._authenticator
+            if self._retry is None:
+                return send_once(node.base_url, authenticator)
+            return self._retry.attempt(node.base_url, lambda: send_once(node.base_url, authenticator))
+
+        # Every retry picks a node again, so a node that is down or slow is not retried before failing over
+        if self._retry is None:
+            return self._nodes.call(method, send_to)
+        return self._retry.call(None, method, lambda: self._nodes.call(method, send_to), event=event)
+
+    def _send_once(self, method: Method, endpoint, headers=None, params=None, body=None, stream=False,
+                   event: RequestEvent = None, base_url: str = None,
+                   authenticator: GalleryAuthenticationMethod = None) -> requests.Response:
+        url = f'{base_url or self._base_url}/{endpoint}'
         api_request = requests.Request(method=method, url=url, headers=headers, params=params, data=body)
-        authed_api_request = self._authenticator.authenticate(api_request)
+        auth_started = time.perf_counter()
+        authed_api_request = (authenticator or self._authenticator).authenticate(api_request)
+        auth_elapsed = time.perf_counter() - auth_started
         prepared_request = authed_api_request.prepare()
-        response = requests.Session().send(prepared_request)
+        response = self._session.send(prepared_request, stream=stream)
+
+        if event is not None:
+            event.auth_elapsed += auth_elapsed
+            event.bytes_sent += int(prepared_request.headers.get('Content-Length', 0))
+            if stream:
+                event.bytes_received += int(response.headers.get('Content-Length', 0))
+            else:
+                event.bytes_received += len(response.content)
         return response
@@ -0,0 +1,184 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict
+
+import requests
+
+# Request headers that change the representation returned for the same endpoint and parameters
+VARY_HEADERS = ('Accept', 'Accept-Language')
+
+
+def _normalize_endpoint(endpoint: str) -> str:
+    return str(endpoint).strip('/')
+
+
+def _is_related(cached_endpoint: str, written_endpoint: str) -> bool:
+    # A write affects the resource itself, anything below it and the collections above it
+    shorter, longer = sorted((cached_endpoint, written_endpoint), key=len)
+    return longer == shorter or longer.startswith(shorter + '/')
+
+
+def request_key(method: str, endpoint: str, params=None, headers=None, scope=None) -> tuple:
+    """
+    Builds a hashable key identifying a request by method, endpoint, parameters, representation headers and scope
+    :param method: The HTTP method of the request
+    :param endpoint: The endpoint relative to the base url
+    :param params: The query parameters of the request
+    :param headers: The headers of the request
+    :param scope: A hashable value identifying the Gallery and credential the request is sent to and with
+    :return: A tuple usable as a dictionary key
+    """
+    params = tuple(sorted((str(key), str(value)) for key, value in (params or {}).items()))
+    headers = {str(key).lower(): str(value) for key, value in (headers or {}).items()}
+    vary = tuple((name, headers.get(name.lower())) for name in VARY_HEADERS)
+    return method, _normalize_endpoint(endpoint), params, vary, scope
+
+
+class _CacheEntry:
+    __slots__ = ('endpoint', 'response', 'expires_at', 'size')
+
+    def __init__(self, endpoint: str, response: requests.Response, expires_at: float):
+        self.endpoint = endpoint
+        self.response = response
+        self.expires_at = expires_at
+        self.size = len(response.content)
+
+    @property
+    def fresh(self) -> bool:
+        return time.monotonic() < self.expires_at
+
+    @property
+    def validators(self) -> Dict[str, str]:
+        validators = {}
+        if 'ETag' in self.response.headers:
+            validators['If-None-Match'] = self.response.headers['ETag']
+        if 'Last-Modified' in self.response.headers:
+            validators['If-Modified-Since'] = self.response.headers['Last-Modified']
+        return validators
+
+
+class ResponseCache:
+    def __init__(self, ttls: Dict[str, float] = None, default_ttl: float = 0, max_entries: int = 1024,
+                 max_bytes: int = 64 * 1024 * 1024):
+        """
+        An opt-in, thread-safe LRU cache for GET responses that can be shared between API objects.  Entries are kept
+        per base url and credential, so API objects only share responses fetched from the same Gallery with the same
+        credential.  Only 200 responses from endpoints with a positive time to live are cached.  Once an entry expires it is revalidated with If-None-Match or
+        If-Modified-Since when the server supplied an ETag or Last-Modified header.  Requests carrying their own
+        validators bypass the cache.  Any other method sent through an API object using the cache invalidates the
+        cached entries for related endpoints.
+        :param ttls: A dictionary mapping endpoint prefixes (e.g. 'admin/v1/users') to a time to live in seconds.
+        The longest matching prefix wins.
+        :param default_ttl: The time to live in seconds for endpoints that match no prefix in ttls
+        :param max_entries: The maximum number of responses kept
+        :param max_bytes: The maximum total size of the response bodies kept
+        """
+        self._ttls = {_normalize_endpoint(prefix): ttl for prefix, ttl in (ttls or {}).items()}
+        self._default_ttl = default_ttl
+        self._max_entries = max_entries
+        self._max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+
+    def ttl_for(self, endpoint: str) -> float:
+        """
+        Returns the time to live configured for an endpoint
+        :param endpoint: The endpoint relative to the base url
+        :return: The time to live in seconds
+        """
+        endpoint = _normalize_endpoint(endpoint)
+        matches = [prefix for prefix in self._ttls if endpoint == prefix or endpoint.startswith(prefix + '/')]
+        if not matches:
+            return self._default_ttl
+        return self._ttls[max(matches, key=len)]
+
+    def get(self, key: tuple):
+        """
+        Looks up a cached entry, counting a hit when it is fresh and a miss otherwise
+        :param key: A key built by request_key
+        :return: The cache entry, which may be stale, or None
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            if entry is not None and entry.fresh:
+                self.hits += 1
+            else:
+                self.misses += 1
+            return entry
+
+    def put(self, key: tuple, response: requests.Response) -> None:
+        """
+        Stores a 200 response if its endpoint is cacheable and it fits within the size limits
+        :param key: A key built by request_key
+        :param response: A fully downloaded requests Response
+        :return: None
+        """
+        endpoint = key[1]
+        ttl = self.ttl_for(endpoint)
+        if ttl <= 0 or response.status_code != 200:
+            return
+
+        entry = _CacheEntry(endpoint, response, time.monotonic() + ttl)
+        if entry.size > self._max_bytes:
+            return
+
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = entry
+            self._size += entry.size
+            while len(self._entries) > self._max_entries or self._size > self._max_bytes:
+                self._remove(next(iter(self._entries)))
+
+    def refresh(self, key: tuple) -> None:
+        """
+        Restarts the time to live of an entry after the server confirmed it is unchanged
+        :param key: A key built by request_key
+        :return: None
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry.expires_at = time.monotonic() + self.ttl_for(entry.endpoint)
+                self.revalidations += 1
+
+    def invalidate(self, endpoint: str = None) -> None:
+        """
+        Removes the entries for an endpoint, the resources below it and the collections above it, for every Gallery
+        :param endpoint: The endpoint relative to the base url.  When omitted, the whole cache is cleared.
+        :return: None
+        """
+        with self._lock:
+            if endpoint is None:
+                self._entries.clear()
+                self._size = 0
+                return
+
+            endpoint = _normalize_endpoint(endpoint)
+            for key in [key for key, entry in self._entries.items() if _is_related(entry.endpoint, endpoint)]:
+                self._remove(key)
+
+    def stats(self) -> dict:
+        """
+        Returns the cache counters
+        :return: A dictionary of hits, misses, revalidations, entries and bytes
+        """
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'revalidations': self.revalidations,
+                'entries': len(self._entries),
+                'bytes': self._size
+            }
+
+    def _remove(self, key: tuple) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._size -= entry.size
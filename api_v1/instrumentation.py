@@ -0,0 +1,178 @@
+import bisect
+import json
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds, in milliseconds, of the latency histogram buckets.  A final bucket catches everything slower.
+LATENCY_BUCKETS_MS = (5, 10, 25, 50, 75, 100, 250, 500, 750, 1000, 2500, 5000, 10000, 30000, 60000)
+
+
+class RequestEvent:
+    """
+    A record of one call to BaseApi._make_request passed to every RequestObserver once the call finishes.
+    Times are in seconds.  auth_elapsed includes any token refresh performed by the authenticator.
+    """
+    __slots__ = ('method', 'template', 'endpoint', 'status_code', 'elapsed', 'auth_elapsed', 'bytes_sent',
+                 'bytes_received', 'retries', 'cached', 'coalesced', 'error')
+
+    def __init__(self, method: str, template: str, endpoint: str):
+        self.method = method
+        self.template = template
+        self.endpoint = endpoint
+        self.status_code = None
+        self.elapsed = 0.0
+        self.auth_elapsed = 0.0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.retries = 0
+        self.cached = False
+        self.coalesced = False
+        self.error = None
+
+
+class RequestObserver:
+    """
+    The base class for objects that are notified of every request sent by an API object
+    """
+
+    def on_request(self, event: RequestEvent) -> None:
+        """
+        Called once a request has completed, failed or been answered from the cache
+        :param event: The RequestEvent describing the request
+        :return: None
+        """
+        pass
+
+
+def notify_observers(observers, event: RequestEvent) -> None:
+    """
+    Passes an event to every observer.  A failing observer is logged and never fails the request itself.
+    :param observers: An iterable of RequestObserver objects
+    :param event: The RequestEvent to pass on
+    :return: None
+    """
+    for observer in observers:
+        try:
+            observer.on_request(event)
+        except Exception:
+            logger.exception('Request observer %r failed', observer)
+
+
+class _EndpointMetrics:
+    __slots__ = ('count', 'errors', 'cached', 'coalesced', 'status_codes', 'buckets', 'latency_sum', 'latency_max',
+                 'auth_sum', 'bytes_sent', 'bytes_received', 'retries')
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.cached = 0
+        self.coalesced = 0
+        self.status_codes = {}
+        self.buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.latency_sum = 0.0
+        self.latency_max = 0.0
+        self.auth_sum = 0.0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.retries = 0
+
+    def _percentile(self, fraction: float):
+        # Reports the upper bound of the bucket holding the requested rank
+        rank = fraction * sum(self.buckets)
+        seen = 0
+        for index, bucket_count in enumerate(self.buckets):
+            seen += bucket_count
+            if bucket_count and seen >= rank:
+                return LATENCY_BUCKETS_MS[index] if index < len(LATENCY_BUCKETS_MS) else None
+        return None
+
+    def snapshot(self) -> dict:
+        sent = sum(self.buckets)
+        return {
+            'count': self.count,
+            'errors': self.errors,
+            'cached': self.cached,
+            'coalesced': self.coalesced,
+            'status_codes': {str(code): count for code, count in sorted(self.status_codes.items())},
+            'latency_ms': {
+                'mean': self.latency_sum * 1000 / sent if sent else 0.0,
+                'max': self.latency_max * 1000,
+                'p50': self._percentile(0.5),
+                'p90': self._percentile(0.9),
+                'p99': self._percentile(0.99),
+                'buckets': dict(zip([str(bound) for bound in LATENCY_BUCKETS_MS] + ['+Inf'], self.buckets))
+            },
+            'auth_ms_total': self.auth_sum * 1000,
+            'bytes_sent': self.bytes_sent,
+            'bytes_received': self.bytes_received,
+            'retries': self.retries
+        }
+
+
+class MetricsCollector(RequestObserver):
+    def __init__(self):
+        """
+        An in-process RequestObserver that aggregates latency histograms, status codes, bytes transferred,
+        authentication time and retries per method and endpoint template (e.g. 'GET v1/jobs/{job_id}').  Latencies
+        only cover requests sent to the Gallery; cached and coalesced requests are counted but kept out of them.
+        A single collector can observe many API objects and is safe to use from many threads.
+        """
+        self._lock = threading.Lock()
+        self._endpoints = {}
+
+    def on_request(self, event: RequestEvent) -> None:
+        key = f'{event.method} {event.template}'
+        with self._lock:
+            metrics = self._endpoints.get(key)
+            if metrics is None:
+                metrics = self._endpoints[key] = _EndpointMetrics()
+
+            metrics.count += 1
+            if event.error is not None or (event.status_code is not None and event.status_code >= 400):
+                metrics.errors += 1
+            if event.cached:
+                metrics.cached += 1
+            if event.coalesced:
+                metrics.coalesced += 1
+            if event.status_code is not None:
+                metrics.status_codes[event.status_code] = metrics.status_codes.get(event.status_code, 0) + 1
+
+            # Answers from the cache or from another caller's request would hide the latency of the Gallery itself
+            if not event.cached and not event.coalesced:
+                metrics.buckets[bisect.bisect_left(LATENCY_BUCKETS_MS, event.elapsed * 1000)] += 1
+                metrics.latency_sum += event.elapsed
+                metrics.latency_max = max(metrics.latency_max, event.elapsed)
+            metrics.auth_sum += event.auth_elapsed
+            metrics.bytes_sent += event.bytes_sent
+            metrics.bytes_received += event.bytes_received
+            metrics.retries += event.retries
+
+    def snapshot(self) -> dict:
+        """
+        Returns the metrics gathered so far
+        :return: A dictionary keyed by 'METHOD endpoint/template'
+        """
+        with self._lock:
+            return {key: metrics.snapshot() for key, metrics in sorted(self._endpoints.items())}
+
+    def export_json(self, path: str = None) -> str:
+        """
+        Serializes a snapshot of the metrics as JSON
+        :param path: An optional file path the JSON is also written to
+        :return: The JSON string
+        """
+        exported = json.dumps(self.snapshot(), indent=2)
+        if path is not None:
+            with open(path, 'w') as metrics_file:
+                metrics_file.write(exported)
+        return exported
+
+    def reset(self) -> None:
+        """
+        Discards every metric gathered so far
+        :return: None
+        """
+        with self._lock:
+            self._endpoints.clear()
@@ -1,18 +1,109 @@
+import heapq
+import os
+import random
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, Iterator, NamedTuple, Optional
+
 import requests
 
-from api_v1.baseapi import BaseApi
+from api_v1.baseapi import BaseApi, Endpoint
+from api_v1.cache import ResponseCache
+from api_v1.packages import DEFAULT_CHUNK_SIZE, clear_resume_state, open_resumable, write_response
+from api_v1.retry import RetryEngine
+from api_v1.session import GallerySession
+from api_v1.singleflight import SingleFlight
 from gallery_authentication import GalleryAuthenticationMethod
 from request_methods.methods import Method
 
+# Job states after which the Gallery will not change a job any more
+TERMINAL_JOB_STATES = frozenset({'Completed', 'Error', 'Failed', 'Cancelled'})
+
+
+# Statuses after which polling a job again may succeed
+TRANSIENT_STATUSES = frozenset({408, 429, 500, 502, 503, 504})
+
+
+class JobOutput:
+    def __init__(self, jobs, job_id: str, output_id: str, output_format: str, headers=None):
+        """
+        A handle on one output of a finished job.  Nothing is downloaded until the output is opened or saved.
+        :param jobs: The Jobs object the output is retrieved with
+        :param job_id: The id representing the job.
+        :param output_id: The id representing the particular output to retrieve.
+        :param output_format: The format to retrieve the output in (e.g. 'Csv' or 'Raw')
+        :param headers: An optional parameter denoting any headers you would like to pass to the requests
+        """
+        self._jobs = jobs
+        self.job_id = job_id
+        self.output_id = output_id
+        self.output_format = output_format
+        self._headers = headers
+
+    def open(self) -> requests.Response:
+        """
+        :return: A streamed get_job_output response, which the caller is responsible for reading or closing
+        """
+        return self._jobs.get_job_output(job_id=self.job_id, output_id=self.output_id, headers=self._headers,
+                                         params={'format': self.output_format}, stream=True)
+
+    def save(self, destination, chunk_size: int = DEFAULT_CHUNK_SIZE,
+             progress: Callable[['TransferProgress'], None] = None) -> int:
+        """
+        Streams the output to a file path or writable binary file object with download_job_output
+        :return: The size of the downloaded output in bytes
+        """
+        return self._jobs.download_job_output(job_id=self.job_id, output_id=self.output_id, destination=destination,
+                                              output_format=self.output_format, chunk_size=chunk_size,
+                                              progress=progress, headers=self._headers)
+
+
+class JobResult(NamedTuple):
+    """
+    A job yielded by wait_for_jobs once it has finished or can no longer be polled.  outputs maps each output id
+    to a JobOutput and is empty unless an output format was requested.  error holds the HTTP error of a job that
+    could not be polled, e.g. because it no longer exists, in which case response is the failed response.
+    """
+    job_id: str
+    response: requests.Response
+    outputs: Dict[str, JobOutput]
+    error: Optional[Exception] = None
+
+    @property
+    def status(self) -> Optional[str]:
+        return self.response.json().get('status') if self.error is None else None
+
+
+class TransferProgress(NamedTuple):
+    """
+    Progress of one job output download, passed to the progress callback after every chunk.
+    total_bytes is None when the Gallery did not announce the size.
+    """
+    job_id: str
+    output_id: str
+    bytes_done: int
+    total_bytes: Optional[int]
+    bytes_per_second: float
+
 
 class Jobs(BaseApi):
-    def __init__(self, base_url: str, authenticator: GalleryAuthenticationMethod):
+    def __init__(self, base_url, authenticator: GalleryAuthenticationMethod, session: GallerySession = None,
+                 cache: ResponseCache = None, observers=None, retry: RetryEngine = None,
+                 single_flight: SingleFlight = None):
         """
         The Jobs class represents the jobs endpoint and all the methods associated with it
-        :param base_url: The base URL of your Gallery API as defined in your server settings
+        :param base_url: The base URL of your Gallery API as defined in your server settings, or a NodePool or list
+        of base URLs to spread requests across several Gallery nodes
         :param authenticator: A GalleryAuthenticationMethod object representing the method for authentication to your Gallery instance (e.g. Oauth1 or Oauth2)
+        :param session: An optional GallerySession used to share a pooled connection between API objects
+        :param cache: An optional ResponseCache used to serve repeated GET requests without a round trip
+        :param observers: An optional list of RequestObserver objects notified of every request
+        :param retry: An optional RetryEngine that retries idempotent requests and backs off when the Gallery is overloaded
+        :param single_flight: An optional SingleFlight that lets identical concurrent GET requests share one round trip
         """
-        super().__init__(base_url=base_url, authenticator=authenticator)
+        super().__init__(base_url=base_url, authenticator=authenticator, session=session, cache=cache,
+                         observers=observers, retry=retry, single_flight=single_flight)
 
     def get_job(self, job_id: str, headers=None, params=None) -> requests.Response:
         """
@@ -22,11 +113,11 @@ class Jobs(BaseApi):
         :param params: An optional parameter denoting any parameters you would like to pass to the request
         :return:
         """
-        endpoint = f'v1/jobs/{job_id}'
+        endpoint = Endpoint('v1/jobs/{job_id}', job_id=job_id)
         response = self._make_request(Method.GET.value, endpoint=endpoint, headers=headers, params=params)
         return response
 
-    def get_job_output(self, job_id: str, output_id: str, headers=None, params=None) -> requests.Response:
+    def get_job_output(self, job_id: str, output_id: str, headers=None, params=None, stream=False) -> requests.Response:
         """
         Get output for a given job.  It is important to pass the 'format' parameter as a param.  The consumer
         of the api is responsible for writing the raw content to a file.
@@ -34,9 +125,177 @@ class Jobs(BaseApi):
         :param output_id: The id representing the particular output to retrieve.
         :param headers: An optional parameter denoting any headers you would like to pass to the request
         :param params: An optional parameter denoting any parameters you would like to pass to the request
+        :param stream: When True, the output is not downloaded until the response content is read
         :return: A request response containing the contents being retrieved
         """
-        endpoint = f'v1/jobs/{job_id}/output/{output_id}'
-        response = self._make_request(Method.GET.value, endpoint=endpoint, headers=headers, params=params)
+        endpoint = Endpoint('v1/jobs/{job_id}/output/{output_id}', job_id=job_id, output_id=output_id)
+        response = self._make_request(Method.GET.value, endpoint=endpoint, headers=headers, params=params,
+                                      stream=stream)
         return response
 
+    def download_job_output(self, job_id: str, output_id: str, destination, output_format: str,
+                            chunk_size: int = DEFAULT_CHUNK_SIZE, progress: Callable[[TransferProgress], None] = None,
+                            headers=None) -> int:
+        """
+        A helper method that wraps around the get_job_output call.  This method streams an output in fixed-size
+        chunks to a file or writable sink, so memory use stays constant regardless of the output size.  When the
+        destination is a path holding a partial download of the same output, it resumes with an HTTP range request;
+        any other file at the path is overwritten.
+        :param job_id: The id representing the job.
+        :param output_id: The id representing the particular output to retrieve.
+        :param destination: A file path, or a writable binary file object
+        :param output_format: The format to retrieve the output in (e.g. 'Csv' or 'Raw')
+        :param chunk_size: The number of bytes read from the connection at a time
+        :param progress: An optional callable receiving a TransferProgress after every chunk
+        :param headers: An optional parameter denoting any headers you would like to pass to the request
+        :return: The size of the downloaded output in bytes
+        """
+        def request(range_headers: dict) -> requests.Response:
+            return self.get_job_output(job_id=job_id, output_id=output_id,
+                                       headers={**(headers or {}), **range_headers},
+                                       params={'format': output_format}, stream=True)
+
+        download_path = destination if isinstance(destination, str) else None
+        response, offset, total_bytes = open_resumable(request, download_path=download_path,
+                                                       source=f'{job_id}/{output_id}/{output_format}')
+        if response is None:
+            # The partial file already holds the whole output
+            clear_resume_state(download_path)
+            return offset
+
+        started = time.monotonic()
+
+        def report(written: int) -> None:
+            elapsed = time.monotonic() - started
+            progress(TransferProgress(job_id=job_id, output_id=output_id, bytes_done=offset + written,
+                                      total_bytes=total_bytes, bytes_per_second=written / elapsed if elapsed else 0.0))
+
+        on_chunk = report if progress is not None else None
+        if download_path is None:
+            size = write_response(response, destination, chunk_size=chunk_size, on_chunk=on_chunk)
+        else:
+            with open(download_path, 'r+b' if offset else 'wb') as output_file:
+                output_file.seek(offset)
+                output_file.truncate()
+                size = offset + write_response(response, output_file, chunk_size=chunk_size, on_chunk=on_chunk)
+
+        if total_bytes is not None and size != total_bytes:
+            raise IOError(f'Output {output_id} of job {job_id} is {size} bytes but {total_bytes} bytes were expected')
+        if download_path is not None:
+            clear_resume_state(download_path)
+        return size
+
+    def download_job_outputs(self, job_id: str, save_path: str, output_format: str, max_workers: int = 4,
+                             chunk_size: int = DEFAULT_CHUNK_SIZE, progress: Callable[[TransferProgress], None] = None,
+                             headers=None) -> Dict[str, str]:
+        """
+        Streams every output of a job into a directory, downloading up to max_workers outputs at once
+        :param job_id: The id representing the job.
+        :param save_path: A path representing the directory the outputs should be saved in
+        :param output_format: The format to retrieve the outputs in (e.g. 'Csv' or 'Raw')
+        :param max_workers: The maximum number of outputs downloaded at once
+        :param chunk_size: The number of bytes read from the connection at a time
+        :param progress: An optional callable receiving a TransferProgress after every chunk of every output
+        :param headers: An optional parameter denoting any headers you would like to pass to the requests
+        :return: A dictionary mapping every output id to the path it was saved to
+        """
+        if not os.path.isdir(save_path):
+            raise NotADirectoryError
+
+        response = self.get_job(job_id=job_id, headers=headers)
+        response.raise_for_status()
+        paths = {}
+        for output in response.json().get('outputs', []):
+            file_name = os.path.basename(output.get('fileName') or '') or f"{output['id']}.{output_format.lower()}"
+            if os.path.join(save_path, file_name) in paths.values():
+                file_name = f"{output['id']}_{file_name}"
+            paths[output['id']] = os.path.join(save_path, file_name)
+
+        def download(output_id: str) -> None:
+            self.download_job_output(job_id=job_id, output_id=output_id, destination=paths[output_id],
+                                     output_format=output_format, chunk_size=chunk_size, progress=progress,
+                                     headers=headers)
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            list(executor.map(download, paths))
+        return paths
+
+    def wait_for_jobs(self, job_ids: Iterable[str], timeout: float = None, initial_interval: float = 1.0,
+                      max_interval: float = 60.0, output_format: str = None, headers=None) -> Iterator[JobResult]:
+        """
+        Waits for many jobs with a single poller and yields each one as soon as it finishes.  Every job is polled
+        with jittered exponential backoff, and once some jobs have finished, jobs still running are not polled again
+        until they approach the typical observed runtime.  Finished jobs are never polled again.  A job that cannot be
+        polled because of a client error is yielded with its error, and transient errors are retried at the next poll.
+        :param job_ids: The ids of the jobs to wait for
+        :param timeout: An optional number of seconds after which a TimeoutError is raised for the unfinished jobs.
+        Every unfinished job is polled one last time when the timeout is reached.
+        :param initial_interval: The number of seconds between the first poll of a job, which is immediate, and the
+        second.  The interval then doubles up to max_interval.
+        :param max_interval: The longest number of seconds between two polls of the same job
+        :param output_format: When given, every finished job carries a JobOutput per output in this format (e.g. 'Csv'),
+        so outputs are only downloaded once the caller opens or saves them, without holding up the polling
+        :param headers: An optional parameter denoting any headers you would like to pass to the requests
+        :return: A generator of JobResult objects in order of completion
+        """
+        started = time.monotonic()
+        deadline = started + timeout if timeout is not None else None
+        intervals = {}
+        runtimes = []
+        schedule = []
+        timed_out = []
+
+        for job_id in dict.fromkeys(job_ids):
+            intervals[job_id] = initial_interval
+            heapq.heappush(schedule, (started, job_id))
+
+        while schedule:
+            due, job_id = schedule[0]
+            now = time.monotonic()
+            if due > now:
+                time.sleep(due - now)
+                continue
+
+            heapq.heappop(schedule)
+            try:
+                response = self.get_job(job_id=job_id, headers=headers)
+                response.raise_for_status()
+            except requests.HTTPError as error:
+                if error.response is None or error.response.status_code not in TRANSIENT_STATUSES:
+                    yield JobResult(job_id=job_id, response=error.response, outputs={}, error=error)
+                    continue
+                job = {}
+            except (requests.ConnectionError, requests.Timeout):
+                job = {}
+            else:
+                job = response.json()
+
+            if job.get('status') in TERMINAL_JOB_STATES:
+                runtimes.append(time.monotonic() - started)
+                outputs = {}
+                if output_format is not None:
+                    for output in job.get('outputs', []):
+                        outputs[output['id']] = JobOutput(self, job_id=job_id, output_id=output['id'],
+                                                          output_format=output_format, headers=headers)
+                yield JobResult(job_id=job_id, response=response, outputs=outputs)
+                continue
+
+            if deadline is not None and time.monotonic() >= deadline:
+                # This was the final poll of the job
+                timed_out.append(job_id)
+                continue
+
+            interval = intervals[job_id]
+            intervals[job_id] = min(interval * 2, max_interval)
+            if runtimes:
+                # Skip ahead to shortly before the point where similar jobs have typically finished
+                expected_remaining = statistics.median(runtimes) - (time.monotonic() - started)
+                interval = min(max(interval, expected_remaining * 0.8), max_interval)
+            interval *= random.uniform(0.8, 1.2)
+            due = time.monotonic() + interval
+            if deadline is not None:
+                due = min(due, deadline)
+            heapq.heappush(schedule, (due, job_id))
+
+        if timed_out:
+            raise TimeoutError(f'Timed out waiting for jobs: {", ".join(sorted(timed_out))}')
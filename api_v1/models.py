@@ -0,0 +1,215 @@
+import codecs
+import json
+from typing import Iterator, List
+
+import requests
+
+# Characters skipped between the items of a JSON array
+_ARRAY_SEPARATORS = ' \t\r\n,'
+
+
+def first_field(record: dict, *paths):
+    """
+    Gallery versions name the same field differently, so this returns the value of the first dotted path present
+    :param record: A record returned by the Gallery
+    :param paths: Dotted paths to try in order, e.g. 'ownerId', 'owner.id'
+    :return: The first value found, or None
+    """
+    for path in paths:
+        value = record
+        for part in path.split('.'):
+            value = value.get(part) if isinstance(value, dict) else None
+        if value is not None:
+            return value
+    return None
+
+
+class Record:
+    """
+    The base class of the typed result models.  Records use __slots__ and keep only the fields they declare,
+    so large result sets take a fraction of the memory of the parsed JSON dictionaries.  Every model maps its
+    attributes to the JSON field names used by the Gallery in _FIELDS.
+    """
+    __slots__ = ()
+    _FIELDS = {}
+
+    def __init__(self, **values):
+        for attribute in self.__slots__:
+            setattr(self, attribute, values.get(attribute))
+
+    @classmethod
+    def from_json(cls, data: dict):
+        """
+        :param data: A dictionary returned by the Gallery
+        :return: A record holding the declared fields of the dictionary
+        """
+        record = cls.__new__(cls)
+        for attribute, paths in cls._FIELDS.items():
+            setattr(record, attribute, first_field(data, *paths))
+        return record
+
+    def to_dict(self) -> dict:
+        return {attribute: getattr(self, attribute) for attribute in self.__slots__}
+
+    def __eq__(self, other):
+        return type(self) is type(other) and self.to_dict() == other.to_dict()
+
+    def __repr__(self):
+        fields = ', '.join(f'{attribute}={getattr(self, attribute)!r}' for attribute in self.__slots__)
+        return f'{type(self).__name__}({fields})'
+
+
+class Workflow(Record):
+    _FIELDS = {
+        'id': ('id',),
+        'name': ('name', 'metaInfo.name', 'fileName'),
+        'owner_id': ('ownerId', 'owner.id'),
+        'subscription_id': ('subscriptionId',),
+        'version': ('publishedVersionNumber', 'version'),
+        'package_type': ('packageType',),
+        'run_count': ('runCount',),
+        'date_created': ('dateCreated', 'uploadDate'),
+        'date_modified': ('dateModified', 'lastModified', 'uploadDate')
+    }
+    __slots__ = tuple(_FIELDS)
+
+
+class Job(Record):
+    _FIELDS = {
+        'id': ('id',),
+        'app_id': ('appId', 'workflowId'),
+        'status': ('status',),
+        'disposition': ('disposition',),
+        'create_date': ('createDate', 'createDateTime'),
+        'outputs': ('outputs',)
+    }
+    __slots__ = tuple(_FIELDS)
+
+
+class User(Record):
+    _FIELDS = {
+        'id': ('id',),
+        'first_name': ('firstName',),
+        'last_name': ('lastName',),
+        'email': ('email',),
+        'role': ('role',),
+        'active': ('active', 'isActive'),
+        'date_created': ('dateCreated',)
+    }
+    __slots__ = tuple(_FIELDS)
+
+
+class Schedule(Record):
+    _FIELDS = {
+        'id': ('id',),
+        'name': ('name',),
+        'workflow_id': ('workflowId', 'appId'),
+        'owner_id': ('ownerId', 'userId'),
+        'enabled': ('enabled',),
+        'frequency': ('frequency', 'iteration.type'),
+        'next_run': ('nextRunTime', 'nextRun')
+    }
+    __slots__ = tuple(_FIELDS)
+
+
+class AuditEntry(Record):
+    _FIELDS = {
+        'id': ('id',),
+        'entity': ('entity',),
+        'entity_id': ('entityId',),
+        'event': ('event', 'action'),
+        'user_id': ('userId',),
+        'timestamp': ('timestamp', 'dateTime', 'date'),
+        'old_values': ('oldValues',),
+        'new_values': ('newValues',)
+    }
+    __slots__ = tuple(_FIELDS)
+
+
+def iter_json_array(response: requests.Response, chunk_size: int = 64 * 1024) -> Iterator:
+    """
+    Parses a JSON array incrementally from a streamed response and yields its items one at a time, so an item
+    can be processed before the rest of the payload has arrived and the whole array is never held in memory
+    :param response: A requests Response that was sent with stream=True and whose body is a JSON array
+    :param chunk_size: The number of bytes read from the connection at a time
+    :return: A generator of the parsed items
+    """
+    decoder = json.JSONDecoder()
+    text_decoder = codecs.getincrementaldecoder(response.encoding or 'utf-8')()
+    chunks = response.iter_content(chunk_size=chunk_size)
+    buffer = ''
+    position = 0
+    exhausted = False
+    started = False
+
+    def read_more() -> bool:
+        nonlocal buffer, position, exhausted
+        if exhausted:
+            return False
+        chunk = next(chunks, None)
+        if chunk is None:
+            exhausted = True
+            buffer = buffer[position:] + text_decoder.decode(b'', final=True)
+        else:
+            buffer = buffer[position:] + text_decoder.decode(chunk)
+        position = 0
+        return True
+
+    try:
+        while True:
+            while position < len(buffer) and buffer[position] in (_ARRAY_SEPARATORS if started else ' \t\r\n\ufeff'):
+                position += 1
+            if position == len(buffer):
+                if not read_more():
+                    raise ValueError('The response ended before the JSON array was complete')
+                continue
+
+            if not started:
+                if buffer[position] != '[':
+                    raise ValueError('The response body is not a JSON array')
+                started = True
+                position += 1
+                continue
+
+            if buffer[position] == ']':
+                return
+
+            try:
+                item, end = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                if not read_more():
+                    raise
+                continue
+
+            # A number is only complete once a delimiter follows it, as it may continue in the next chunk
+            is_number = isinstance(item, (int, float)) and not isinstance(item, bool)
+            if is_number and not exhausted and (end == len(buffer) or buffer[end] not in _ARRAY_SEPARATORS + ']'):
+                read_more()
+                continue
+
+            position = end
+            yield item
+    finally:
+        response.close()
+
+
+def iter_records(response: requests.Response, model=None, chunk_size: int = 64 * 1024) -> Iterator:
+    """
+    Yields the items of a streamed JSON array response, optionally converted into a typed model
+    :param response: A requests Response that was sent with stream=True and whose body is a JSON array
+    :param model: An optional Record subclass, e.g. Workflow.  When omitted, dictionaries are yielded.
+    :param chunk_size: The number of bytes read from the connection at a time
+    :return: A generator of records
+    """
+    for item in iter_json_array(response, chunk_size=chunk_size):
+        yield model.from_json(item) if model is not None else item
+
+
+def parse_records(response: requests.Response, model) -> List:
+    """
+    Converts the JSON array held by a response into a list of typed records
+    :param response: A requests Response whose body is a JSON array
+    :param model: A Record subclass, e.g. Workflow
+    :return: A list of records
+    """
+    return [model.from_json(item) for item in response.json()]
@@ -0,0 +1,164 @@
+import random
+import threading
+import time
+from typing import Dict, Iterable, List
+
+import requests
+
+from gallery_authentication import GalleryAuthenticationMethod
+from request_methods.methods import Method
+
+
+class _Node:
+    __slots__ = ('base_url', 'authenticator', 'in_flight', 'latency', 'failures', 'ejected_until', 'probing',
+                 'requests', 'errors')
+
+    def __init__(self, base_url: str, authenticator: GalleryAuthenticationMethod = None):
+        self.base_url = base_url.rstrip('/')
+        self.authenticator = authenticator
+        self.in_flight = 0
+        self.latency = None
+        self.failures = 0
+        self.ejected_until = None
+        self.probing = False
+        self.requests = 0
+        self.errors = 0
+
+    def available(self, now: float) -> bool:
+        # An ejected node receives a single probe request once its ejection has expired
+        if self.ejected_until is None:
+            return True
+        return now >= self.ejected_until and not self.probing
+
+    def score(self, default_latency: float) -> float:
+        # The expected wait: recent latency scaled by the requests already queued on the node and its recent failures.
+        # A node without a latency sample is assumed as slow as the pool on average, so its failures still count.
+        latency = default_latency if self.latency is None else self.latency
+        return (self.in_flight + 1) * latency * (self.failures + 1)
+
+
+class NodePool:
+    def __init__(self, base_urls: Iterable[str], authenticators: Dict[str, GalleryAuthenticationMethod] = None,
+                 failure_threshold: int = 3, ejection_time: float = 30.0, latency_decay: float = 0.3):
+        """
+        Spreads the requests of an API object across several Gallery nodes.  Each request goes to the healthy node
+        with the lowest expected wait, judged by its requests in flight and a moving average of its latency.  A node
+        failing failure_threshold times in a row is ejected and receives a single probe request once ejection_time
+        has passed; a successful probe returns it to the pool.  Idempotent requests that cannot reach a node are
+        sent to another one.  Pass a NodePool, or a list of base URLs, as the base_url of any API object.
+        :param base_urls: The base URLs of the Gallery nodes
+        :param authenticators: An optional dictionary mapping base URLs to the authenticator used for that node,
+        e.g. an OAuth2 object per node when tokens are not shared between nodes.  Other nodes use the API object's authenticator.
+        :param failure_threshold: The number of consecutive failures that ejects a node
+        :param ejection_time: The number of seconds an ejected node is left alone before it is probed
+        :param latency_decay: The weight of the newest response time in the moving average of a node's latency
+        """
+        authenticators = {url.rstrip('/'): authenticator for url, authenticator in (authenticators or {}).items()}
+        self._nodes = [_Node(url, authenticators.get(url.rstrip('/'))) for url in base_urls]
+        if not self._nodes:
+            raise ValueError('A NodePool needs at least one base url')
+        self._failure_threshold = failure_threshold
+        self._ejection_time = ejection_time
+        self._latency_decay = latency_decay
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._nodes)
+
+    def acquire(self, exclude=()) -> _Node:
+        """
+        Picks the node for the next request and counts the request as in flight on it
+        :param exclude: Nodes that must not be picked, e.g. because the request already failed on them
+        :return: The chosen node, which must be passed to release() once the request is over
+        """
+        with self._lock:
+            now = time.monotonic()
+            candidates = [node for node in self._nodes if node not in exclude]
+            healthy = [node for node in candidates if node.available(now)]
+            if healthy:
+                measured = [node.latency for node in self._nodes if node.latency is not None]
+                default_latency = sum(measured) / len(measured) if measured else 1.0
+                node = min(healthy, key=lambda candidate: (candidate.score(default_latency), candidate.in_flight,
+                                                           random.random()))
+            elif candidates:
+                # Every node is ejected, so the one due back soonest is tried rather than failing outright
+                node = min(candidates, key=lambda candidate: candidate.ejected_until or now)
+            else:
+                raise requests.ConnectionError('No Gallery node is left to send the request to')
+
+            if node.ejected_until is not None:
+                node.probing = True
+            node.in_flight += 1
+            node.requests += 1
+            return node
+
+    def release(self, node: _Node, elapsed: float = None, failed: bool = None) -> None:
+        """
+        Records the outcome of a request sent to a node
+        :param node: The node returned by acquire()
+        :param elapsed: The response time in seconds.  It is left out of the latency average when omitted or when
+        the request failed, as failures are often fast.
+        :param failed: Whether the node failed to answer or answered with a server error.  When omitted, for
+        instance because the request failed before reaching the node, its health is left unchanged.
+        :return: None
+        """
+        with self._lock:
+            node.in_flight -= 1
+            node.probing = False
+            if failed is None:
+                return
+            if elapsed is not None and not failed:
+                node.latency = elapsed if node.latency is None else (
+                    self._latency_decay * elapsed + (1 - self._latency_decay) * node.latency)
+
+            if not failed:
+                node.failures = 0
+                node.ejected_until = None
+                return
+
+            node.errors += 1
+            node.failures += 1
+            if node.ejected_until is not None or node.failures >= self._failure_threshold:
+                node.ejected_until = time.monotonic() + self._ejection_time
+
+    def call(self, method: str, send):
+        """
+        Sends a request to the best node, moving idempotent requests on to another node when a node cannot be reached
+        :param method: The HTTP method of the request
+        :param send: A callable taking a node and returning its response
+        :return: The requests Response
+        """
+        tried = []
+        while True:
+            node = self.acquire(exclude=tried)
+            started = time.perf_counter()
+            try:
+                response = send(node)
+            except (requests.ConnectionError, requests.Timeout):
+                self.release(node, time.perf_counter() - started, failed=True)
+                tried.append(node)
+                if not Method(method).idempotent or len(tried) == len(self._nodes):
+                    raise
+                continue
+            except BaseException:
+                self.release(node)
+                raise
+
+            self.release(node, time.perf_counter() - started, failed=response.status_code >= 500)
+            return response
+
+    def stats(self) -> List[dict]:
+        """
+        :return: A dictionary per node with its health, requests in flight, average latency and request counts
+        """
+        with self._lock:
+            now = time.monotonic()
+            return [{
+                'base_url': node.base_url,
+                'healthy': node.ejected_until is None,
+                'ejected_for': max(0.0, node.ejected_until - now) if node.ejected_until is not None else 0.0,
+                'in_flight': node.in_flight,
+                'latency_ms': node.latency * 1000 if node.latency is not None else None,
+                'requests': node.requests,
+                'errors': node.errors
+            } for node in self._nodes]
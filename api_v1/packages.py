@@ -0,0 +1,415 @@
+import fnmatch
+import hashlib
+import io
+import json
+import mmap
+import os
+import re
+import tempfile
+import zipfile
+from typing import IO, List
+from xml.etree import ElementTree
+
+import requests
+
+# Packages are written in 1 MiB chunks and kept in memory only while they are smaller than 8 MiB
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+SPOOL_MAX_SIZE = 8 * 1024 * 1024
+
+# Appended to a download path to name the file recording what a partial download holds
+RESUME_SUFFIX = '.resume'
+
+
+class PackageIntegrityError(IOError):
+    pass
+
+
+def _hash_file(file_obj, chunk_size: int):
+    digest = hashlib.sha256()
+    file_obj.seek(0)
+    for chunk in iter(lambda: file_obj.read(chunk_size), b''):
+        digest.update(chunk)
+    return digest
+
+
+def write_response(response: requests.Response, file_obj, chunk_size: int = DEFAULT_CHUNK_SIZE, digest=None,
+                   on_chunk=None) -> int:
+    """
+    Writes the body of a streamed response to a file object one chunk at a time
+    :param response: A requests Response that was sent with stream=True
+    :param file_obj: A writable binary file object
+    :param chunk_size: The number of bytes read from the connection at a time
+    :param digest: An optional hashlib object updated with every chunk written
+    :param on_chunk: An optional callable receiving the number of bytes written so far after every chunk
+    :return: The number of bytes written
+    """
+    written = 0
+    try:
+        for chunk in response.iter_content(chunk_size=chunk_size):
+            if not chunk:
+                continue
+            file_obj.write(chunk)
+            if digest is not None:
+                digest.update(chunk)
+            written += len(chunk)
+            if on_chunk is not None:
+                on_chunk(written)
+    finally:
+        response.close()
+    return written
+
+
+def _content_range(response: requests.Response) -> tuple:
+    # Parses 'bytes 100-199/200' or 'bytes */200' into the first byte and the complete length, either may be None
+    match = re.fullmatch(r'bytes (?:(\d+)-\d+|\*)/(\d+|\*)', response.headers.get('Content-Range', '').strip())
+    if match is None:
+        return None, None
+    first, total = match.groups()
+    return int(first) if first is not None else None, int(total) if total != '*' else None
+
+
+def _read_resume_state(download_path: str):
+    try:
+        with open(download_path + RESUME_SUFFIX, 'r') as state_file:
+            return json.load(state_file)
+    except (OSError, ValueError):
+        return None
+
+
+def clear_resume_state(download_path: str) -> None:
+    """
+    Forgets what a partial download holds, so the next download to the same path starts over
+    :param download_path: The path of the downloaded file
+    :return: None
+    """
+    try:
+        os.unlink(download_path + RESUME_SUFFIX)
+    except FileNotFoundError:
+        pass
+
+
+def open_resumable(request, download_path: str = None, source: str = None, version: str = None) -> tuple:
+    """
+    Sends a download request, resuming the partial file at download_path only when it is known to hold the start of
+    the same content.  Every fresh download records its source, version, validators and length next to the file, and a
+    resumed request carries If-Range, so a stale or unrelated file is replaced rather than completed with new content.
+    :param request: A callable taking a dictionary of extra headers and returning a streamed requests Response
+    :param download_path: The path being downloaded to.  When omitted, nothing is resumed or recorded.
+    :param source: A string identifying the content, e.g. an app id
+    :param version: An optional version of the content known to the caller, e.g. a workflow's modification date
+    :return: A tuple of the response, or None when the partial file already holds all of the content, the number
+    of bytes of the partial file to keep, and the complete size of the content, or None when it is unknown
+    """
+    state = _read_resume_state(download_path) if download_path is not None else None
+    offset = 0
+    if (state is not None and state.get('source') == source and state.get('version') == version
+            and os.path.isfile(download_path)):
+        offset = os.path.getsize(download_path)
+
+    # Weak ETags cannot be used with If-Range, and without a validator or version nothing proves the file is current
+    etag = state.get('etag') if state is not None else None
+    validator = etag if etag and not etag.startswith('W/') else state.get('last_modified') if state else None
+    if validator is None and version is None:
+        offset = 0
+
+    if offset:
+        headers = {'Range': f'bytes={offset}-'}
+        if validator is not None:
+            headers['If-Range'] = validator
+        response = request(headers)
+        first, total = _content_range(response)
+        length = state.get('length')
+        if response.status_code == 416 and total == offset and length in (None, total):
+            response.close()
+            return None, offset, total
+        if response.status_code == 206 and first == offset and total is not None and length in (None, total):
+            return response, offset, total
+        if response.status_code != 200:
+            # The partial file does not match the content on the server, so the download starts over
+            if response.status_code != 416:
+                response.raise_for_status()
+            response.close()
+            response = request({})
+    else:
+        response = request({})
+
+    response.raise_for_status()
+    content_length = response.headers.get('Content-Length')
+    encoded = response.headers.get('Content-Encoding', 'identity') != 'identity'
+    total = int(content_length) if content_length and not encoded else None
+    if download_path is not None:
+        with open(download_path + RESUME_SUFFIX, 'w') as state_file:
+            json.dump({'source': source, 'version': version, 'etag': response.headers.get('ETag'),
+                       'last_modified': response.headers.get('Last-Modified'), 'length': total}, state_file)
+    return response, 0, total
+
+
+def download_package(get_package, app_id: str, download_path: str = None, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                     sha256: str = None, spool: bool = True, version: str = None):
+    """
+    Streams a package to a file without holding the whole archive in memory.  When a download path is given and
+    a partial download of the same package was left there, the download resumes with an HTTP range request.
+    :param get_package: The get_package method of an Admin or Workflows object
+    :param app_id: The id of the package to retrieve
+    :param download_path: An optional file path to download to.  When omitted, a spooled temporary file is used.
+    :param chunk_size: The number of bytes read from the connection at a time
+    :param sha256: An optional hex digest the downloaded package must match
+    :param spool: When False and no download path is given, the temporary file is always written to disk
+    :param version: An optional version of the package, e.g. its modification date.  A partial download
+    recorded under another version is discarded.
+    :return: A binary file object positioned at the start of the package.  The caller is responsible for closing it.
+    """
+    response, offset, expected_size = open_resumable(
+        lambda headers: get_package(app_id=app_id, headers=headers or None, stream=True),
+        download_path=download_path, source=app_id, version=version)
+
+    digest = None
+    if response is None:
+        # The partial file already holds the whole package
+        file_obj = open(download_path, 'r+b')
+    else:
+        if download_path is None and spool:
+            file_obj = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+        elif download_path is None:
+            file_obj = tempfile.TemporaryFile()
+        else:
+            file_obj = open(download_path, 'r+b' if offset else 'w+b')
+            file_obj.seek(offset)
+            file_obj.truncate()
+
+        if sha256 is not None and not offset:
+            digest = hashlib.sha256()
+
+        try:
+            write_response(response, file_obj, chunk_size=chunk_size, digest=digest)
+        except BaseException:
+            file_obj.close()
+            raise
+
+    try:
+        file_obj.flush()
+        file_obj.seek(0, os.SEEK_END)
+        size = file_obj.tell()
+        if expected_size is not None and size != expected_size:
+            raise PackageIntegrityError(f'Package {app_id} is {size} bytes but {expected_size} bytes were expected')
+
+        if sha256 is not None:
+            # A resumed download has to hash the bytes written by the earlier attempt as well
+            actual = (digest or _hash_file(file_obj, chunk_size)).hexdigest()
+            if actual.lower() != sha256.lower():
+                # A corrupt file must not be resumed, so the next download starts over
+                if download_path is not None:
+                    clear_resume_state(download_path)
+                raise PackageIntegrityError(f'Package {app_id} has checksum {actual} but {sha256} was expected')
+    except BaseException:
+        file_obj.close()
+        raise
+
+    if download_path is not None:
+        clear_resume_state(download_path)
+    file_obj.seek(0)
+    return file_obj
+
+
+def save_package(get_package, app_id: str, save_path: str, download_path: str = None,
+                 chunk_size: int = DEFAULT_CHUNK_SIZE, sha256: str = None) -> bool:
+    """
+    Streams a package to a file and extracts it into a directory, keeping peak memory flat regardless of package size
+    :param get_package: The get_package method of an Admin or Workflows object
+    :param app_id: The id of the package to retrieve
+    :param save_path: A path representing where the package should be extracted
+    :param download_path: An optional file path to download to, allowing an interrupted download to be resumed
+    :param chunk_size: The number of bytes read from the connection at a time
+    :param sha256: An optional hex digest the downloaded package must match
+    :return: Returns True when contents are saved
+    """
+    if not os.path.isdir(save_path):
+        raise NotADirectoryError
+
+    with download_package(get_package, app_id, download_path=download_path, chunk_size=chunk_size,
+                          sha256=sha256) as file_obj:
+        with zipfile.ZipFile(file_obj) as zipped_package:
+            zipped_package.extractall(save_path)
+
+    return True
+
+
+def extract_package(content: bytes, save_path: str) -> None:
+    """
+    Extracts a package that is already held in memory, e.g. the body of an AsyncResponse
+    :param content: The bytes of the package
+    :param save_path: A path representing where the package should be extracted
+    :return: None
+    """
+    # A BytesIO created from bytes shares their buffer until it is written to, so the package is not copied
+    with zipfile.ZipFile(io.BytesIO(content)) as zipped_package:
+        zipped_package.extractall(save_path)
+
+
+class _MappedFile(io.RawIOBase):
+    """
+    A read-only, seekable file object over a memory map, which lets zipfile read members without copying the archive
+    """
+
+    def __init__(self, mapped: mmap.mmap):
+        self._mapped = mapped
+        self._position = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        data = self._mapped[self._position:self._position + len(buffer)]
+        buffer[:len(data)] = data
+        self._position += len(data)
+        return len(data)
+
+    def seek(self, offset: int, whence: int = os.SEEK_SET) -> int:
+        if whence == os.SEEK_CUR:
+            offset += self._position
+        elif whence == os.SEEK_END:
+            offset += len(self._mapped)
+        self._position = max(0, offset)
+        return self._position
+
+    def tell(self) -> int:
+        return self._position
+
+
+class Package:
+    # Extensions of the documents that describe a workflow, analytic app or macro
+    WORKFLOW_EXTENSIONS = ('.yxmd', '.yxwz', '.yxmc')
+
+    def __init__(self, file_obj):
+        """
+        A lazily opened package.  The archive is memory-mapped, members are listed from the zip directory without
+        being read, and a member is only decompressed when it is opened.
+        :param file_obj: A binary file object backed by a real file holding the package.  The Package takes ownership of it.
+        """
+        self._file_obj = file_obj
+        self._mapped = mmap.mmap(file_obj.fileno(), 0, access=mmap.ACCESS_READ)
+        self._zip = zipfile.ZipFile(_MappedFile(self._mapped))
+
+    @classmethod
+    def download(cls, get_package, app_id: str, download_path: str = None, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                 sha256: str = None):
+        """
+        Streams a package to disk and opens it lazily
+        :param get_package: The get_package method of an Admin or Workflows object
+        :param app_id: The id of the package to retrieve
+        :param download_path: An optional file path to download to.  When omitted, a temporary file is used.
+        :param chunk_size: The number of bytes read from the connection at a time
+        :param sha256: An optional hex digest the downloaded package must match
+        :return: A Package, which should be closed when no longer needed
+        """
+        file_obj = download_package(get_package, app_id, download_path=download_path, chunk_size=chunk_size,
+                                    sha256=sha256, spool=False)
+        try:
+            return cls(file_obj)
+        except BaseException:
+            file_obj.close()
+            raise
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self) -> None:
+        self._zip.close()
+        self._mapped.close()
+        self._file_obj.close()
+
+    def members(self) -> List[zipfile.ZipInfo]:
+        """
+        :return: The ZipInfo of every member, read from the zip directory only
+        """
+        return self._zip.infolist()
+
+    def names(self) -> List[str]:
+        """
+        :return: The name of every member
+        """
+        return self._zip.namelist()
+
+    def open(self, member: str) -> IO[bytes]:
+        """
+        Opens a member as a stream that is decompressed as it is read
+        :param member: The name of the member
+        :return: A binary file object
+        """
+        return self._zip.open(member)
+
+    def read(self, member: str) -> bytes:
+        """
+        :param member: The name of the member
+        :return: The decompressed contents of the member
+        """
+        return self._zip.read(member)
+
+    def workflow_member(self) -> str:
+        """
+        :return: The name of the main workflow document, preferring the one closest to the root of the archive
+        """
+        candidates = [name for name in self.names() if name.lower().endswith(self.WORKFLOW_EXTENSIONS)]
+        if not candidates:
+            raise FileNotFoundError('The package does not contain a workflow document')
+        return min(candidates, key=lambda name: (name.count('/'), name))
+
+    def workflow_metadata(self, member: str = None) -> dict:
+        """
+        Parses a workflow document incrementally, without building its whole XML tree, and collects its tools,
+        inputs and analytic app questions
+        :param member: The name of the workflow document, defaulting to workflow_member()
+        :return: A dictionary of 'tools', 'inputs' and 'questions' lists
+        """
+        tools, inputs, questions = [], [], []
+        with self.open(member or self.workflow_member()) as document:
+            for _, element in ElementTree.iterparse(document, events=('end',)):
+                if element.tag == 'Node':
+                    gui_settings = element.find('GuiSettings')
+                    tool = {
+                        'tool_id': element.get('ToolID'),
+                        'plugin': gui_settings.get('Plugin') if gui_settings is not None else None
+                    }
+                    tools.append(tool)
+                    configuration = element.find('Properties/Configuration')
+                    if tool['plugin'] and 'Input' in tool['plugin'] and configuration is not None:
+                        inputs.append({**tool, 'file': configuration.findtext('File'),
+                                       'connection': configuration.findtext('Connection')})
+                    element.clear()
+                elif element.tag == 'Question':
+                    tool_id = element.find('ToolId')
+                    questions.append({
+                        'name': element.findtext('Name'),
+                        'type': element.findtext('Type'),
+                        'description': element.findtext('Description'),
+                        'tool_id': tool_id.get('value') if tool_id is not None else None
+                    })
+                    element.clear()
+        return {'tools': tools, 'inputs': inputs, 'questions': questions}
+
+    def search(self, pattern: bytes, members: str = '*', chunk_size: int = DEFAULT_CHUNK_SIZE) -> List[str]:
+        """
+        Finds the members containing a byte string, e.g. a connection string, reading each member as a stream
+        :param pattern: The bytes to search for
+        :param members: A glob pattern selecting the members to search
+        :param chunk_size: The number of decompressed bytes read at a time
+        :return: The names of the members containing the pattern
+        """
+        matches = []
+        overlap = len(pattern) - 1
+        for name in fnmatch.filter(self.names(), members):
+            tail = b''
+            with self.open(name) as stream:
+                for chunk in iter(lambda: stream.read(chunk_size), b''):
+                    window = tail + chunk
+                    if pattern in window:
+                        matches.append(name)
+                        break
+                    tail = window[-overlap:] if overlap else b''
+        return matches
@@ -0,0 +1,38 @@
+import threading
+import time
+
+
+class RateLimiter:
+    def __init__(self, rate: float, burst: int = 1):
+        """
+        A thread-safe token bucket that caps how many requests are started per second
+        :param rate: The sustained number of requests allowed per second
+        :param burst: The number of requests that may be started back to back before the rate applies
+        """
+        if rate <= 0:
+            raise ValueError('rate must be greater than 0')
+
+        self._rate = rate
+        self._burst = max(1, burst)
+        self._tokens = float(self._burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """
+        Blocks until a request may be started
+        :return: None
+        """
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self._burst, self._tokens + (now - self._updated) * self._rate)
+                self._updated = now
+
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+
+                wait = (1 - self._tokens) / self._rate
+
+            time.sleep(wait)
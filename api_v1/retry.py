@@ -0,0 +1,252 @@
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+from typing import Optional
+
+import requests
+
+from request_methods.methods import Method
+
+# Statuses that signal the server is shedding load rather than failing
+THROTTLE_STATUSES = frozenset({429, 503})
+
+
+class CircuitOpenError(requests.ConnectionError, ConnectionError):
+    # A requests.ConnectionError so it is handled like an unreachable server, e.g. by NodePool failover
+    pass
+
+
+class RetryPolicy:
+    def __init__(self, max_retries: int = 3, backoff_base: float = 0.5, backoff_max: float = 30.0,
+                 retry_statuses=(429, 500, 502, 503, 504), respect_retry_after: bool = True):
+        """
+        Describes when and how long to wait before retrying an idempotent request
+        :param max_retries: The maximum number of retries after the first attempt
+        :param backoff_base: The delay in seconds before the first retry, doubled for every further retry
+        :param backoff_max: The longest delay in seconds between two attempts.  A response asking the client to wait
+        longer with Retry-After is returned to the caller rather than retried early.
+        :param retry_statuses: The response statuses that are retried
+        :param respect_retry_after: When True, a Retry-After header sent by the server sets the delay
+        """
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.retry_statuses = frozenset(retry_statuses)
+        self.respect_retry_after = respect_retry_after
+
+    def delay(self, attempt: int, response: requests.Response = None) -> Optional[float]:
+        """
+        Returns the number of seconds to wait before the next attempt, using full jitter unless the server said otherwise
+        :param attempt: The number of attempts already made, minus one
+        :param response: The response that is being retried, if any
+        :return: The delay in seconds, or None when the server asked for a longer wait than backoff_max
+        """
+        if self.respect_retry_after and response is not None and 'Retry-After' in response.headers:
+            retry_after = _parse_retry_after(response.headers['Retry-After'])
+            if retry_after is not None:
+                return retry_after if retry_after <= self.backoff_max else None
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+
+def _parse_retry_after(value: str):
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+
+class AdaptiveConcurrencyLimiter:
+    def __init__(self, initial: int = 10, minimum: int = 1, maximum: int = 100):
+        """
+        Bounds the number of requests in flight with an additive-increase, multiplicative-decrease limit: every
+        successful response raises the limit by roughly one per round of requests, and every throttled response halves it.
+        :param initial: The starting limit
+        :param minimum: The lowest the limit may fall to
+        :param maximum: The highest the limit may grow to
+        """
+        self._limit = float(initial)
+        self._minimum = minimum
+        self._maximum = maximum
+        self._in_flight = 0
+        self._condition = threading.Condition()
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    def acquire(self) -> None:
+        with self._condition:
+            while self._in_flight >= int(self._limit):
+                self._condition.wait()
+            self._in_flight += 1
+
+    def release(self, throttled: bool = False) -> None:
+        with self._condition:
+            self._in_flight -= 1
+            if throttled:
+                self._limit = max(self._minimum, self._limit / 2)
+            else:
+                self._limit = min(self._maximum, self._limit + 1 / self._limit)
+            self._condition.notify_all()
+
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold: int = 5, recovery_timeout: float = 30.0):
+        """
+        Stops sending requests to a server after consecutive failures and lets a single trial request through
+        once the recovery timeout has passed
+        :param failure_threshold: The number of consecutive failures that opens the circuit
+        :param recovery_timeout: The number of seconds the circuit stays open before a trial request is allowed
+        """
+        self._failure_threshold = failure_threshold
+        self._recovery_timeout = recovery_timeout
+        self._failures = 0
+        self._opened_at = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def open(self) -> bool:
+        return self._opened_at is not None
+
+    def before_request(self) -> None:
+        """
+        Raises a CircuitOpenError if requests are currently not allowed through
+        :return: None
+        """
+        with self._lock:
+            if self._opened_at is None:
+                return
+            if self._trial_in_flight or time.monotonic() - self._opened_at < self._recovery_timeout:
+                raise CircuitOpenError('The circuit is open after repeated failures; the Gallery is not being called')
+            self._trial_in_flight = True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def cancel_trial(self) -> None:
+        """
+        Gives up a trial request that never reached the server, without counting it either way
+        :return: None
+        """
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._trial_in_flight or self._failures >= self._failure_threshold:
+                self._opened_at = time.monotonic()
+            self._trial_in_flight = False
+
+
+class RetryEngine:
+    def __init__(self, policy: RetryPolicy = None, initial_concurrency: int = 10, max_concurrency: int = 100,
+                 failure_threshold: int = 5, recovery_timeout: float = 30.0):
+        """
+        Retries idempotent requests with backoff and keeps an adaptive concurrency limit and a circuit breaker for
+        every base url it sees.  Share one RetryEngine between the API objects talking to the same Gallery so they
+        respect the same limits.
+        :param policy: The RetryPolicy deciding which responses are retried and for how long to wait
+        :param initial_concurrency: The starting number of requests allowed in flight per base url
+        :param max_concurrency: The highest number of requests the limit may grow to per base url
+        :param failure_threshold: The number of consecutive failures that opens a base url's circuit
+        :param recovery_timeout: The number of seconds a base url's circuit stays open
+        """
+        self.policy = policy or RetryPolicy()
+        self._initial_concurrency = initial_concurrency
+        self._max_concurrency = max_concurrency
+        self._failure_threshold = failure_threshold
+        self._recovery_timeout = recovery_timeout
+        self._limiters = {}
+        self._breakers = {}
+        self._lock = threading.Lock()
+
+    def limiter(self, base_url: str) -> AdaptiveConcurrencyLimiter:
+        with self._lock:
+            if base_url not in self._limiters:
+                self._limiters[base_url] = AdaptiveConcurrencyLimiter(initial=self._initial_concurrency,
+                                                                      maximum=self._max_concurrency)
+            return self._limiters[base_url]
+
+    def breaker(self, base_url: str) -> CircuitBreaker:
+        with self._lock:
+            if base_url not in self._breakers:
+                self._breakers[base_url] = CircuitBreaker(failure_threshold=self._failure_threshold,
+                                                          recovery_timeout=self._recovery_timeout)
+            return self._breakers[base_url]
+
+    def attempt(self, base_url: str, send) -> requests.Response:
+        """
+        Sends a request once through the base url's limiter and circuit breaker, without retrying it
+        :param base_url: The base url the request is sent to
+        :param send: A callable sending the request once and returning its response
+        :return: The requests Response
+        """
+        limiter = self.limiter(base_url)
+        breaker = self.breaker(base_url)
+        breaker.before_request()
+        limiter.acquire()
+        try:
+            response = send()
+        except (requests.ConnectionError, requests.Timeout):
+            limiter.release(throttled=True)
+            breaker.record_failure()
+            raise
+        except BaseException:
+            limiter.release()
+            breaker.cancel_trial()
+            raise
+
+        limiter.release(throttled=response.status_code in THROTTLE_STATUSES)
+        if response.status_code >= 500:
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+        return response
+
+    def call(self, base_url: str, method: str, send, event=None) -> requests.Response:
+        """
+        Sends a request through the base url's limiter and circuit breaker, retrying it when allowed
+        :param base_url: The base url the request is sent to, or None when send picks the base url itself on every
+        attempt and passes each one through attempt(), e.g. to choose a node from a NodePool again on every retry
+        :param method: The HTTP method of the request.  Only idempotent methods are retried.
+        :param send: A callable sending the request once and returning its response
+        :param event: An optional RequestEvent whose retries counter is updated
+        :return: The final requests Response
+        """
+        retryable = Method(method).idempotent
+        attempt = 0
+
+        while True:
+            try:
+                response = send() if base_url is None else self.attempt(base_url, send)
+            except CircuitOpenError:
+                raise
+            except (requests.ConnectionError, requests.Timeout):
+                if not retryable or attempt >= self.policy.max_retries:
+                    raise
+                delay = self.policy.delay(attempt)
+            else:
+                if (not retryable or attempt >= self.policy.max_retries
+                        or response.status_code not in self.policy.retry_statuses):
+                    return response
+                delay = self.policy.delay(attempt, response)
+                if delay is None:
+                    # Retrying before the server's Retry-After would only add to the load it is shedding
+                    return response
+                response.close()
+
+            attempt += 1
+            if event is not None:
+                event.retries += 1
+            time.sleep(delay)
@@ -0,0 +1,68 @@
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class GallerySession:
+    def __init__(self, pool_connections: int = 10, pool_maxsize: int = 10, pool_block: bool = False,
+                 timeout=None, keep_alive: bool = True):
+        """
+        The GallerySession object owns a pooled, keep-alive HTTP connection pool that can be shared by any number
+        of Admin, Jobs and Workflows instances pointing at the same Gallery.  It is safe to use from many threads.
+        :param pool_connections: The number of distinct hosts to keep connection pools for
+        :param pool_maxsize: The maximum number of connections kept open per host
+        :param pool_block: When True, requests wait for a free connection instead of opening an extra one
+        :param timeout: A default timeout in seconds (or a (connect, read) tuple) applied to every request
+        :param keep_alive: When False, every request asks the server to close the connection afterwards
+        """
+        self._timeout = timeout
+        self._keep_alive = keep_alive
+        self._lock = threading.Lock()
+        self._closed = False
+
+        adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, pool_block=pool_block)
+        self._session = requests.Session()
+        self._session.mount('http://', adapter)
+        self._session.mount('https://', adapter)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    def send(self, prepared_request: requests.PreparedRequest, stream: bool = False, timeout=None) -> requests.Response:
+        """
+        Sends a prepared request over the pooled connections
+        :param prepared_request: An authenticated, prepared request
+        :param stream: When True, the response body is not downloaded until it is accessed
+        :param timeout: An optional timeout overriding the session default
+        :return: A requests Response
+        """
+        if self._closed:
+            raise RuntimeError('Cannot send a request through a closed GallerySession')
+
+        if timeout is None:
+            timeout = self._timeout
+
+        # Session headers are not merged into prepared requests, so the header is set on the request itself
+        if not self._keep_alive:
+            prepared_request.headers['Connection'] = 'close'
+
+        return self._session.send(prepared_request, stream=stream, timeout=timeout)
+
+    def close(self) -> None:
+        """
+        Closes every pooled connection.  Safe to call more than once.
+        :return: None
+        """
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._session.close()
@@ -0,0 +1,100 @@
+import asyncio
+import threading
+
+
+class _Call:
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    def __init__(self):
+        """
+        Collapses identical concurrent calls: while a call for a key is in flight, other threads asking for the same
+        key wait for it and receive its result (or its exception) instead of making their own call.
+        Share one SingleFlight between API objects to coalesce their identical GET requests.
+        """
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.executed = 0
+        self.collapsed = 0
+
+    def do(self, key, function):
+        """
+        Runs function unless a call for the same key is already in flight, in which case its outcome is shared
+        :param key: A hashable key identifying the call
+        :param function: A callable taking no arguments
+        :return: A tuple of the result and whether it was shared from another caller's call
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.executed += 1
+            else:
+                self.collapsed += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = function()
+            return call.result, False
+        except BaseException as error:
+            call.error = error
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def stats(self) -> dict:
+        """
+        :return: A dictionary with the number of calls executed, collapsed into another call, and in flight
+        """
+        with self._lock:
+            return {'executed': self.executed, 'collapsed': self.collapsed, 'in_flight': len(self._calls)}
+
+
+class AsyncSingleFlight:
+    def __init__(self):
+        """
+        The asyncio counterpart of SingleFlight: coroutines awaiting the same key share one task.
+        It must only be used from a single event loop.
+        """
+        self._calls = {}
+        self.executed = 0
+        self.collapsed = 0
+
+    async def do(self, key, coroutine_function):
+        """
+        Awaits coroutine_function() unless a call for the same key is already in flight, in which case its outcome is shared
+        :param key: A hashable key identifying the call
+        :param coroutine_function: A callable taking no arguments and returning an awaitable
+        :return: A tuple of the result and whether it was shared from another caller's call
+        """
+        task = self._calls.get(key)
+        shared = task is not None
+        if shared:
+            self.collapsed += 1
+        else:
+            self.executed += 1
+            task = self._calls[key] = asyncio.ensure_future(coroutine_function())
+            task.add_done_callback(lambda _: self._calls.pop(key, None))
+
+        # Shielded so one cancelled caller does not cancel the request for everyone sharing it
+        return await asyncio.shield(task), shared
+
+    def stats(self) -> dict:
+        """
+        :return: A dictionary with the number of calls executed, collapsed into another call, and in flight
+        """
+        return {'executed': self.executed, 'collapsed': self.collapsed, 'in_flight': len(self._calls)}
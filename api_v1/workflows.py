@@ -1,11 +1,17 @@
-import io
 import json
-import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, Iterator, List, NamedTuple, Optional
 
 import requests
-import zipfile
 
-from api_v1.baseapi import BaseApi
+from api_v1.baseapi import BaseApi, Endpoint
+from api_v1.cache import ResponseCache
+from api_v1.models import Job
+from api_v1.packages import DEFAULT_CHUNK_SIZE, Package, save_package
+from api_v1.ratelimit import RateLimiter
+from api_v1.retry import RetryEngine
+from api_v1.session import GallerySession
+from api_v1.singleflight import SingleFlight
 from gallery_authentication.gallery_authentication_method import GalleryAuthenticationMethod
 from request_methods.methods import Method
 
@@ -30,14 +36,43 @@ def _build_questions_list(questions={}) -> object:
     return questions_body
 
 
+class JobSubmission(NamedTuple):
+    """
+    The outcome of one item of a post_jobs_batch call.  error is None when the job was queued; otherwise it holds
+    the exception that was raised, and response holds the Gallery's answer if one was received.
+    """
+    questions: dict
+    response: Optional[requests.Response]
+    error: Optional[Exception]
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+    @property
+    def job_id(self) -> Optional[str]:
+        if not self.ok:
+            return None
+        return self.response.json().get('id')
+
+
 class Workflows(BaseApi):
-    def __init__(self, base_url: str, authenticator: GalleryAuthenticationMethod):
+    def __init__(self, base_url, authenticator: GalleryAuthenticationMethod, session: GallerySession = None,
+                 cache: ResponseCache = None, observers=None, retry: RetryEngine = None,
+                 single_flight: SingleFlight = None):
         """
         The Workflows class represents the workflow endpoint and all the methods associated with it
-        :param base_url: The base URL of your Gallery API as defined in your server settings
+        :param base_url: The base URL of your Gallery API as defined in your server settings, or a NodePool or list
+        of base URLs to spread requests across several Gallery nodes
         :param authenticator: A GalleryAuthenticationMethod object representing the method for authentication to your Gallery instance (e.g. Oauth1 or Oauth2)
+        :param session: An optional GallerySession used to share a pooled connection between API objects
+        :param cache: An optional ResponseCache used to serve repeated GET requests without a round trip
+        :param observers: An optional list of RequestObserver objects notified of every request
+        :param retry: An optional RetryEngine that retries idempotent requests and backs off when the Gallery is overloaded
+        :param single_flight: An optional SingleFlight that lets identical concurrent GET requests share one round trip
         """
-        super().__init__(base_url=base_url, authenticator=authenticator)
+        super().__init__(base_url=base_url, authenticator=authenticator, session=session, cache=cache,
+                         observers=observers, retry=retry, single_flight=single_flight)
 
     def get_subscription(self, headers=None, params=None) -> requests.Response:
         """
@@ -58,13 +93,61 @@ class Workflows(BaseApi):
         :param headers: An optional parameter denoting any headers you would like to pass to the request
         :return: A requests Response (application/json) by default unless specified otherwise in the header
         """
-        endpoint = f'v1/workflows/{app_id}/jobs'
+        endpoint = Endpoint('v1/workflows/{app_id}/jobs', app_id=app_id)
         questions = _build_questions_list(questions=questions)
         questions = json.dumps(questions)
+        headers = dict(headers or {})
         headers['Content-Type'] = 'application/json'
         response = self._make_request(Method.POST.value, endpoint=endpoint, headers=headers, body=questions)
         return response
 
+    def post_jobs_batch(self, app_id: str, questions_list: Iterable[dict], max_workers: int = 8,
+                        rate_limit: float = None, headers=None) -> List[JobSubmission]:
+        """
+        Queues one job per answer set for the specified workflow, submitting up to max_workers jobs at a time.
+        A failed submission is recorded in its JobSubmission and does not stop the rest of the batch.
+        :param app_id: The id for the workflow to execute.
+        :param questions_list: An iterable of dictionaries, each representing the questions and answers for one job.
+        :param max_workers: The maximum number of submissions in flight at once
+        :param rate_limit: An optional cap on the number of submissions started per second
+        :param headers: An optional parameter denoting any headers you would like to pass to every request
+        :return: A list of JobSubmission objects in the same order as questions_list
+        """
+        endpoint = Endpoint('v1/workflows/{app_id}/jobs', app_id=app_id)
+        questions_list = list(questions_list)
+        limiter = RateLimiter(rate_limit) if rate_limit else None
+
+        def serialize(questions: dict) -> tuple:
+            try:
+                return json.dumps(_build_questions_list(questions=questions)), None
+            except Exception as error:
+                return None, error
+
+        # Every answer set is serialized up front so worker threads only send, and one that cannot be serialized
+        # fails its own submission only
+        bodies = [serialize(questions) for questions in questions_list]
+
+        def submit(questions: dict, serialized: tuple) -> JobSubmission:
+            body, error = serialized
+            if error is not None:
+                return JobSubmission(questions=questions, response=None, error=error)
+            if limiter is not None:
+                limiter.acquire()
+
+            request_headers = dict(headers or {})
+            request_headers['Content-Type'] = 'application/json'
+            try:
+                response = self._make_request(Method.POST.value, endpoint=endpoint, headers=request_headers, body=body)
+                response.raise_for_status()
+            except requests.HTTPError as error:
+                return JobSubmission(questions=questions, response=error.response, error=error)
+            except Exception as error:
+                return JobSubmission(questions=questions, response=None, error=error)
+            return JobSubmission(questions=questions, response=response, error=None)
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return list(executor.map(submit, questions_list, bodies))
+
     def get_jobs(self, app_id: str, headers=None, params=None) -> requests.Response:
         """
         Returns the jobs for the given Alteryx Analytics App
@@ -73,10 +156,22 @@ class Workflows(BaseApi):
         :param params: An optional parameter denoting any parameters you would like to pass to the request
         :return: A requests Response (application/json) by default unless specified otherwise in the header
         """
-        endpoint = f'v1/workflows/{app_id}/jobs'
+        endpoint = Endpoint('v1/workflows/{app_id}/jobs', app_id=app_id)
         response = self._make_request(Method.GET.value, endpoint=endpoint, headers=headers, params=params)
         return response
 
+    def iter_jobs(self, app_id: str, model=Job, headers=None, params=None) -> Iterator:
+        """
+        Streams the jobs for the given Alteryx Analytics App, parsing the response incrementally
+        :param app_id: The id for the workflow to get jobs for.
+        :param model: The Record subclass each job is converted to, or None to yield dictionaries
+        :param headers: An optional parameter denoting any headers you would like to pass to the request
+        :param params: An optional parameter denoting any parameters you would like to pass to the request
+        :return: A generator of records
+        """
+        endpoint = Endpoint('v1/workflows/{app_id}/jobs', app_id=app_id)
+        return self._iter_records(endpoint, model=model, headers=headers, params=params)
+
     def get_questions(self, app_id: str, headers=None, params=None) -> requests.Response:
         """
         Get the questions for the given Alteryx Analytics App
@@ -85,37 +180,46 @@ class Workflows(BaseApi):
         :param params: An optional parameter denoting any parameters you would like to pass to the request
         :return: A requests Response (application/json) by default unless specified otherwise in the header
         """
-        endpoint = f'v1/workflows/{app_id}/questions'
+        endpoint = Endpoint('v1/workflows/{app_id}/questions', app_id=app_id)
         response = self._make_request(Method.GET.value, endpoint=endpoint, headers=headers, params=params)
         return response
 
-    def get_package(self, app_id) -> requests.Response:
+    def get_package(self, app_id, headers=None, stream=False) -> requests.Response:
         """
         Returns the app that was requested
         :param app_id: The id of the package to retrieve.
-        :return: Returns True when contents are saved
+        :param headers: An optional parameter denoting any headers you would like to pass to the request
+        :param stream: When True, the package is not downloaded until the response content is read
+        :return: A requests Response containing the package
         """
-        endpoint = f'/v1/workflows/{app_id}/package'
+        endpoint = Endpoint('/v1/workflows/{app_id}/package', app_id=app_id)
 
-        response = self._make_request(Method.GET.value, endpoint=endpoint)
+        response = self._make_request(Method.GET.value, endpoint=endpoint, headers=headers, stream=stream)
         return response
 
-    def get_package_and_save(self, app_id: str, save_path: str) -> bool:
+    def get_package_and_save(self, app_id: str, save_path: str, download_path: str = None,
+                             chunk_size: int = DEFAULT_CHUNK_SIZE, sha256: str = None) -> bool:
         """
         A helper method that wraps around the get_package call.  This method will retrieve
-        a package from the API and save it to a designated path
+        a package from the API and save it to a designated path.  The package is streamed to
+        a temporary file in chunks, so it is never held in memory as a whole.
         :param app_id: The id of the package to retrieve.
         :param save_path: A path representing where the package should be saved
+        :param download_path: An optional file path for the downloaded archive.  If a partial download exists there it is resumed.
+        :param chunk_size: The number of bytes read from the connection at a time
+        :param sha256: An optional hex digest the downloaded package must match
         :return: Returns True when contents are saved
         """
+        return save_package(self.get_package, app_id, save_path, download_path=download_path,
+                            chunk_size=chunk_size, sha256=sha256)
 
-        if not os.path.isdir(save_path):
-            raise NotADirectoryError
-
-        response = self.get_package(app_id=app_id)
-        zipped_package = zipfile.ZipFile(io.BytesIO(response.content))
-        zipped_package.extractall(save_path)
-
-        return True
-
-
+    def open_package(self, app_id: str, download_path: str = None, sha256: str = None) -> Package:
+        """
+        A helper method that wraps around the get_package call.  This method streams a package to disk and
+        opens it lazily, so single members can be listed, read or parsed without extracting the whole package
+        :param app_id: The id of the package to retrieve.
+        :param download_path: An optional file path for the downloaded archive.  If a partial download exists there it is resumed.
+        :param sha256: An optional hex digest the downloaded package must match
+        :return: A Package, which should be closed when no longer needed
+        """
+        return Package.download(self.get_package, app_id, download_path=download_path, sha256=sha256)
@@ -0,0 +1,184 @@
+"""
+A local stand-in for the Gallery API used by the benchmark suite.  It implements the oauth2 token route and the
+admin/v1, v1/workflows and v1/jobs routes used by this library, with configurable latency and payload sizes.
+"""
+import io
+import json
+import re
+import threading
+import time
+import uuid
+import zipfile
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+
+class FakeGalleryConfig:
+    def __init__(self, latency: float = 0.0, token_latency: float = 0.0, token_lifetime: int = 3600,
+                 list_size: int = 100, package_size: int = 1024 * 1024, output_size: int = 64 * 1024,
+                 audit_log_size: int = 1000, job_runtime: float = 0.5):
+        """
+        :param latency: Seconds added to every API response
+        :param token_latency: Seconds added to every token response
+        :param token_lifetime: The expires_in value of issued tokens
+        :param list_size: The number of records returned by list endpoints
+        :param package_size: The approximate size in bytes of the package archive
+        :param output_size: The size in bytes of every job output
+        :param audit_log_size: The total number of audit log entries
+        :param job_runtime: Seconds after submission at which a job reports Completed
+        """
+        self.latency = latency
+        self.token_latency = token_latency
+        self.token_lifetime = token_lifetime
+        self.list_size = list_size
+        self.package_size = package_size
+        self.output_size = output_size
+        self.audit_log_size = audit_log_size
+        self.job_runtime = job_runtime
+
+
+def _build_package(size: int) -> bytes:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_STORED) as package:
+        package.writestr('workflow.yxmd', '<AlteryxDocument yxmdVer="2020.1"><Nodes/><Properties/></AlteryxDocument>')
+        package.writestr('data/blob.bin', bytes(range(256)) * (size // 256 + 1))
+    return buffer.getvalue()
+
+
+def _record(index: int) -> dict:
+    return {
+        'id': f'{index:024x}',
+        'name': f'record {index}',
+        'ownerId': f'{index % 10:024x}',
+        'dateCreated': '2020-01-01T00:00:00Z',
+        'description': 'x' * 64
+    }
+
+
+class FakeGallery:
+    def __init__(self, config: FakeGalleryConfig = None, host: str = '127.0.0.1', port: int = 0):
+        """
+        Serves the fake Gallery from a background thread.  Use as a context manager or call start() and stop().
+        :param config: A FakeGalleryConfig describing latency and payload sizes
+        :param host: The interface to listen on
+        :param port: The port to listen on, 0 picking a free port
+        """
+        self.config = config or FakeGalleryConfig()
+        self.package = _build_package(self.config.package_size)
+        self.token_requests = 0
+        self.requests = 0
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}/webapi'
+
+    @property
+    def auth_url(self) -> str:
+        return f'{self.base_url}/oauth2/token'
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._server.serve_forever, name='fake-gallery', daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _handler_class(self):
+        gallery = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            # Headers and body are written separately, so with Nagle's algorithm and delayed ACKs every keep-alive
+            # request would wait about 40 ms and the benchmarks would measure TCP rather than the client
+            disable_nagle_algorithm = True
+
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                gallery._handle(self, 'GET')
+
+            def do_POST(self):
+                gallery._handle(self, 'POST')
+
+        return Handler
+
+    def _handle(self, handler: BaseHTTPRequestHandler, method: str) -> None:
+        url = urlsplit(handler.path)
+        path = url.path.rstrip('/')
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        length = int(handler.headers.get('Content-Length', 0))
+        body = handler.rfile.read(length) if length else b''
+
+        if path.endswith('/oauth2/token') and method == 'POST':
+            with self._lock:
+                self.token_requests += 1
+            time.sleep(self.config.token_latency)
+            self._send_json(handler, {'access_token': uuid.uuid4().hex, 'token_type': 'bearer',
+                                      'expires_in': self.config.token_lifetime})
+            return
+
+        with self._lock:
+            self.requests += 1
+        time.sleep(self.config.latency)
+
+        path = re.sub(r'^/webapi', '', path)
+        if re.fullmatch(r'/+(admin/v1|v1/workflows)/[^/]+/package', path):
+            self._send_bytes(handler, self.package, 'application/octet-stream')
+        elif path == '/admin/v1/auditlog':
+            page, page_size = int(query.get('page', 1)), int(query.get('pageSize', 100))
+            start = (page - 1) * page_size
+            stop = min(start + page_size, self.config.audit_log_size)
+            self._send_json(handler, [_record(index) for index in range(start, stop)])
+        elif re.fullmatch(r'/v1/workflows/[^/]+/jobs', path) and method == 'POST':
+            job_id = uuid.uuid4().hex
+            with self._lock:
+                self._jobs[job_id] = time.monotonic()
+            self._send_json(handler, {'id': job_id, 'status': 'Queued', 'answers': json.loads(body or b'{}')})
+        elif re.fullmatch(r'/v1/jobs/[^/]+/output/[^/]+', path):
+            self._send_bytes(handler, b'o' * self.config.output_size, 'application/octet-stream')
+        elif match := re.fullmatch(r'/v1/jobs/([^/]+)', path):
+            submitted = self._jobs.get(match.group(1), 0)
+            done = time.monotonic() - submitted >= self.config.job_runtime
+            self._send_json(handler, {'id': match.group(1), 'status': 'Completed' if done else 'Running',
+                                      'outputs': [{'id': 'output1', 'availableFormats': ['Raw']}] if done else []})
+        elif path.startswith('/admin/v1/') or path.startswith('/v1/workflows'):
+            self._send_json(handler, [_record(index) for index in range(self.config.list_size)])
+        else:
+            self._send_json(handler, {'error': 'not_found', 'error_description': path}, status=404)
+
+    def _send_json(self, handler: BaseHTTPRequestHandler, payload, status: int = 200) -> None:
+        self._send_bytes(handler, json.dumps(payload).encode(), 'application/json', status=status)
+
+    def _send_bytes(self, handler: BaseHTTPRequestHandler, content: bytes, content_type: str, status: int = 200) -> None:
+        range_header = handler.headers.get('Range')
+        if status == 200 and range_header and (match := re.fullmatch(r'bytes=(\d+)-', range_header)):
+            offset = int(match.group(1))
+            if offset >= len(content):
+                handler.send_response(416)
+                handler.send_header('Content-Length', '0')
+                handler.end_headers()
+                return
+            handler.send_response(206)
+            handler.send_header('Content-Range', f'bytes {offset}-{len(content) - 1}/{len(content)}')
+            content = content[offset:]
+        else:
+            handler.send_response(status)
+        handler.send_header('Content-Type', content_type)
+        handler.send_header('Content-Length', str(len(content)))
+        handler.end_headers()
+        handler.wfile.write(content)
@@ -0,0 +1,145 @@
+"""
+Runs the benchmark suite against a local FakeGallery and prints the results as JSON, so runs can be compared
+across commits.
+
+    python -m benchmarks.run_benchmarks --output bench.json
+"""
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+from api_v1.admin import Admin
+from api_v1.jobs import Jobs
+from api_v1.session import GallerySession
+from api_v1.workflows import Workflows
+from benchmarks.fake_gallery import FakeGallery, FakeGalleryConfig
+from gallery_authentication import OAuth2
+
+
+def _percentile(samples, fraction: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def _latency_summary(samples, elapsed: float) -> dict:
+    return {
+        'requests': len(samples),
+        'requests_per_second': len(samples) / elapsed if elapsed else 0.0,
+        'p50_ms': _percentile(samples, 0.5) * 1000,
+        'p99_ms': _percentile(samples, 0.99) * 1000,
+        'mean_ms': statistics.mean(samples) * 1000
+    }
+
+
+def bench_throughput(gallery: FakeGallery, requests: int, threads: int) -> dict:
+    """
+    Measures requests per second and latency of Jobs.get_job and Admin.get_users over one shared session
+    """
+    authenticator = OAuth2('client', 'secret', gallery.auth_url)
+    results = {}
+    with GallerySession(pool_maxsize=threads) as session:
+        jobs = Jobs(gallery.base_url, authenticator, session=session)
+        admin = Admin(gallery.base_url, authenticator, session=session)
+        for name, call in (('get_job', lambda index: jobs.get_job(job_id=str(index))),
+                           ('get_users', lambda index: admin.get_users())):
+            def timed(index):
+                started = time.perf_counter()
+                call(index).raise_for_status()
+                return time.perf_counter() - started
+
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=threads) as executor:
+                samples = list(executor.map(timed, range(requests)))
+            results[name] = _latency_summary(samples, time.perf_counter() - started)
+    return results
+
+
+def bench_package(gallery: FakeGallery) -> dict:
+    """
+    Measures duration and peak Python memory of get_package_and_save for the configured package size
+    """
+    authenticator = OAuth2('client', 'secret', gallery.auth_url)
+    results = {'package_bytes': len(gallery.package)}
+    for name, api in (('admin', Admin(gallery.base_url, authenticator)),
+                      ('workflows', Workflows(gallery.base_url, authenticator))):
+        with api, tempfile.TemporaryDirectory() as save_path:
+            tracemalloc.start()
+            started = time.perf_counter()
+            api.get_package_and_save(app_id='benchmark', save_path=save_path)
+            elapsed = time.perf_counter() - started
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+        results[name] = {'seconds': elapsed, 'peak_memory_bytes': peak}
+    return results
+
+
+def bench_token_contention(gallery: FakeGallery, threads: int) -> dict:
+    """
+    Starts many threads at once against an expired token and counts how many tokens get minted
+    """
+    authenticator = OAuth2('client', 'secret', gallery.auth_url)
+    barrier = threading.Barrier(threads)
+    token_requests_before = gallery.token_requests
+
+    def get_token(_):
+        barrier.wait()
+        started = time.perf_counter()
+        authenticator.get_bearer_token()
+        return time.perf_counter() - started
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        samples = list(executor.map(get_token, range(threads)))
+    summary = _latency_summary(samples, time.perf_counter() - started)
+    summary['token_requests'] = gallery.token_requests - token_requests_before
+    return summary
+
+
+def _commit() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv=None) -> dict:
+    parser = argparse.ArgumentParser(description='Benchmark the Gallery API client against a local fake Gallery')
+    parser.add_argument('--requests', type=int, default=500, help='Requests per throughput benchmark')
+    parser.add_argument('--threads', type=int, default=16, help='Concurrent client threads')
+    parser.add_argument('--latency', type=float, default=0.002, help='Seconds of server latency per request')
+    parser.add_argument('--token-latency', type=float, default=0.05, help='Seconds of latency per token request')
+    parser.add_argument('--package-size', type=int, default=64 * 1024 * 1024, help='Package size in bytes')
+    parser.add_argument('--list-size', type=int, default=100, help='Records returned by list endpoints')
+    parser.add_argument('--output', help='Write the JSON results to this file as well as stdout')
+    args = parser.parse_args(argv)
+
+    config = FakeGalleryConfig(latency=args.latency, token_latency=args.token_latency,
+                               package_size=args.package_size, list_size=args.list_size)
+    with FakeGallery(config) as gallery:
+        results = {
+            'commit': _commit(),
+            'python': platform.python_version(),
+            'config': vars(args),
+            'throughput': bench_throughput(gallery, requests=args.requests, threads=args.threads),
+            'package': bench_package(gallery),
+            'token_contention': bench_token_contention(gallery, threads=args.threads)
+        }
+
+    exported = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w') as output_file:
+            output_file.write(exported)
+    sys.stdout.write(exported + '\n')
+    return results
+
+
+if __name__ == '__main__':
+    main()
@@ -1,3 +1,5 @@
 from .oauth2 import OAuth2
 from .oauth1 import OAuth1
+from .async_oauth2 import AsyncOAuth2
 from .gallery_authentication_method import GalleryAuthenticationMethod
+from .token_store import TokenStore, MemoryTokenStore, FileTokenStore
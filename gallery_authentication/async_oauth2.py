@@ -0,0 +1,98 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import requests
+
+from .oauth2 import OAuth2
+from .token_store import TokenStore
+
+
+class AsyncOAuth2(OAuth2):
+    def __init__(self, client_id, client_secret, gallery_auth_url, refresh_margin: float = 60,
+                 token_store: TokenStore = None):
+        """
+        The AsyncOAuth2 object manages OAuth 2.0 authentication for the asyncio clients.  Tokens are requested
+        through the client's AsyncGallerySession and concurrent coroutines share a single refresh.
+        It can also be used with the blocking clients, in which case it behaves exactly like OAuth2.
+        :param client_id: The client ID located in an API-enabled Alteryx profile
+        :param client_secret: The client secret located in an API-enabled Alteryx profile
+        :param gallery_auth_url: The authentication url e.g. https://{gallerysite}/webapi/oauth2/token
+        :param refresh_margin: The number of seconds before expiry at which the token is refreshed.
+        Tokens living less than twice as long are refreshed half way through their lifetime instead.
+        :param token_store: An optional TokenStore used to share one token between OAuth2 objects or processes
+        """
+        super().__init__(client_id=client_id, client_secret=client_secret, gallery_auth_url=gallery_auth_url,
+                         refresh_margin=refresh_margin, token_store=token_store)
+        self._async_lock = None
+
+    async def _get_bearer_token_async(self, session) -> None:
+        """
+        Attempts to get a bearer token without blocking the event loop
+        :param session: The AsyncGallerySession used to reach the auth url
+        :return: None
+        """
+        auth_body = {
+            "grant_type": "client_credentials",
+            "client_id": self._client_id,
+            "client_secret": self._client_secret
+        }
+
+        prepared_request = requests.Request(method='POST', url=self._gallery_auth_url, data=auth_body).prepare()
+        response = await session.send(prepared_request.method, prepared_request.url,
+                                      headers=dict(prepared_request.headers), body=prepared_request.body)
+        response = await response.json(content_type=None)
+
+        if 'access_token' in response:
+            lifetime = timedelta(seconds=response['expires_in'])
+            self._set_token(f"Bearer {response['access_token']}", datetime.now() + lifetime, lifetime)
+
+        if 'error' in response:
+            raise ConnectionError(
+                f"The following error was returned when attempting to connect to Gallery: {response['error']}:{response['error_description']}")
+
+    async def _refresh_bearer_token_async(self, session) -> None:
+        """
+        Creates a new bearer token if it doesn't exist or is about to expire.  Only one coroutine performs the
+        refresh; the others wait for it and reuse its token.
+        :param session: The AsyncGallerySession used to reach the auth url
+        :return: None
+        """
+        if self._token_is_valid(self._token_margin):
+            return
+
+        if self._async_lock is None:
+            self._async_lock = asyncio.Lock()
+
+        async with self._async_lock:
+            if self._token_is_valid(self._token_margin):
+                return
+            if self._token_store is None:
+                await self._get_bearer_token_async(session)
+            else:
+                # The store's lock is held while the token is minted, so the blocking mint runs in the default executor
+                await asyncio.get_running_loop().run_in_executor(None, self._mint_with_lock)
+
+    def _mint_with_lock(self) -> None:
+        with self._lock:
+            if not self._token_is_valid(self._token_margin):
+                self._mint_bearer_token()
+
+    async def get_bearer_token_async(self, session) -> str:
+        """
+        Returns the current bearer token, creating a new one if it is expired or doesn't exist
+        :param session: The AsyncGallerySession used to reach the auth url
+        :return: A string representing the active bearer token
+        """
+        await self._refresh_bearer_token_async(session)
+        return self._bearer_token
+
+    async def authenticate_async(self, request: requests.Request, session) -> requests.Request:
+        """
+        Decorates the passed in request with a bearer token used to authenticate to Gallery
+        :param request: A request object that will be decorated with a bearer token
+        :param session: The AsyncGallerySession used to reach the auth url
+        :return: The original request object with the addition of a bearer token
+        """
+        await self._refresh_bearer_token_async(session)
+        request.headers['Authorization'] = self._bearer_token
+        return request
@@ -5,6 +5,14 @@ from requests import Request
 
 
 class GalleryAuthenticationMethod(ABC):
+    @property
+    def identity(self):
+        """
+        A hashable value identifying the credential, so responses cached or shared for one credential are never
+        returned to API objects authenticating with another.  Defaults to the authentication object itself.
+        """
+        return self
+
     def authenticate(self, request: Request) -> requests.Request:
         """
         This decorator function is used to pass the proper authorization header to an API function call.
@@ -12,4 +20,14 @@ class GalleryAuthenticationMethod(ABC):
         :param request: A request object that will be decorated with authentication
         :return: None
         """
-        pass
\ No newline at end of file
+        pass
+
+    async def authenticate_async(self, request: Request, session) -> requests.Request:
+        """
+        The awaitable counterpart of authenticate used by the asyncio clients.  Authentication methods that
+        need network access should override this so they do not block the event loop.
+        :param request: A request object that will be decorated with authentication
+        :param session: The AsyncGallerySession the request will be sent through
+        :return: The decorated request object
+        """
+        return self.authenticate(request)
@@ -1,11 +1,15 @@
+import threading
+
 import requests
 from datetime import datetime, timedelta
 
 from .gallery_authentication_method import GalleryAuthenticationMethod
+from .token_store import TokenStore
 
 
 class OAuth2(GalleryAuthenticationMethod):
-    def __init__(self, client_id, client_secret, gallery_auth_url):
+    def __init__(self, client_id, client_secret, gallery_auth_url, refresh_margin: float = 60,
+                 token_store: TokenStore = None):
         """
         The OAuth2 object is used to manage the authentication to the Alteryx Gallery API via
         OAuth 2.0 and assists in decorating requests with a bearer token.
@@ -13,12 +17,26 @@ class OAuth2(GalleryAuthenticationMethod):
         :param client_secret: The client secret located in an API-enabled Alteryx profile
         :param gallery_auth_url: The authentication url e.g. https://{gallerysite}/webapi/oauth2/token
         :param gallery_base_url: The API root url defined in your gallery setting e.g. https://{gallerysite}/webapi
+        :param refresh_margin: The number of seconds before expiry at which the token is refreshed in the background.
+        Tokens living less than twice as long are refreshed half way through their lifetime instead.
+        :param token_store: An optional TokenStore used to share one token between OAuth2 objects or processes
         """
         self._client_id = client_id
         self._client_secret = client_secret
         self._gallery_auth_url = gallery_auth_url
         self._bearer_token = None
         self._token_expiration = None
+        self._token_lifetime = None
+        self._refresh_margin = timedelta(seconds=refresh_margin)
+        self._token_margin = self._refresh_margin
+        self._token_store = token_store
+        self._lock = threading.Lock()
+        self._background_lock = threading.Lock()
+        self._background_refresh = None
+
+    @property
+    def identity(self):
+        return type(self).__name__, self._gallery_auth_url, self._client_id
 
     def __str__(self):
         return str({
@@ -43,24 +61,88 @@ class OAuth2(GalleryAuthenticationMethod):
         response = requests.post(self._gallery_auth_url, data=auth_body).json()
 
         if 'access_token' in response:
-            self._bearer_token = f"Bearer {response['access_token']}"
-            self._token_expiration = datetime.now() + timedelta(seconds=response['expires_in'])
+            lifetime = timedelta(seconds=response['expires_in'])
+            self._set_token(f"Bearer {response['access_token']}", datetime.now() + lifetime, lifetime)
 
         if 'error' in response:
             raise ConnectionError(
                 f"The following error was returned when attempting to connect to Gallery: {response['error']}:{response['error_description']}")
 
-    def _refresh_bearer_token(self) -> None:
+    def _margin_for(self, lifetime: timedelta) -> timedelta:
+        # A margin of half the lifetime or more would leave the token stale from the moment it is minted,
+        # so every call would start another refresh
+        return min(self._refresh_margin, lifetime / 2)
+
+    def _set_token(self, bearer_token: str, expiration: datetime, lifetime: timedelta) -> None:
+        # The expiration and margin are set first so concurrent readers never see a token without them
+        self._token_margin = self._margin_for(lifetime)
+        self._token_expiration = expiration
+        self._token_lifetime = lifetime
+        self._bearer_token = bearer_token
+
+    def _token_is_valid(self, margin: timedelta = timedelta(0)) -> bool:
+        return self._bearer_token is not None and datetime.now() + margin < self._token_expiration
+
+    def _store_key(self) -> str:
+        return f'{self._client_id}@{self._gallery_auth_url}'
+
+    def _mint_bearer_token(self) -> None:
         """
-        Checks to see if a bearer token exists or is expired and creates a new one if it either doesn't
-        exist or has expired.
+        Gets a new bearer token, reusing one from the token store when another object or process has
+        already minted a token that is not about to expire.  Must be called while holding self._lock.
         :return: None
         """
-        if not self._bearer_token:
+        if self._token_store is None:
             self._get_bearer_token()
+            return
+
+        with self._token_store.lock():
+            token = self._token_store.load()
+            if token is not None and token.get('key') == self._store_key():
+                expiration = datetime.fromisoformat(token['token_expiration'])
+                remaining = expiration - datetime.now()
+                lifetime = timedelta(seconds=token['lifetime']) if 'lifetime' in token else remaining
+                if remaining > self._margin_for(lifetime):
+                    self._set_token(token['bearer_token'], expiration, lifetime)
+                    return
 
-        if datetime.now() >= self._token_expiration:
             self._get_bearer_token()
+            self._token_store.save({
+                'key': self._store_key(),
+                'bearer_token': self._bearer_token,
+                'token_expiration': self._token_expiration.isoformat(),
+                'lifetime': self._token_lifetime.total_seconds()
+            })
+
+    def _refresh_in_background(self) -> None:
+        def refresh():
+            with self._lock:
+                if not self._token_is_valid(self._token_margin):
+                    self._mint_bearer_token()
+
+        with self._background_lock:
+            if self._background_refresh is not None and self._background_refresh.is_alive():
+                return
+            self._background_refresh = threading.Thread(target=refresh, name='oauth2-token-refresh', daemon=True)
+            self._background_refresh.start()
+
+    def _refresh_bearer_token(self) -> None:
+        """
+        Checks to see if a bearer token exists or is expired and creates a new one if it either doesn't
+        exist or has expired.  A token that is about to expire keeps being used while a single background
+        thread replaces it.  Concurrent callers never mint more than one token at a time.
+        :return: None
+        """
+        if self._token_is_valid(self._token_margin):
+            return
+
+        if self._token_is_valid():
+            self._refresh_in_background()
+            return
+
+        with self._lock:
+            if not self._token_is_valid():
+                self._mint_bearer_token()
 
     def get_bearer_token(self) -> str:
         """
@@ -0,0 +1,110 @@
+import contextlib
+import json
+import os
+import tempfile
+import threading
+from abc import ABC, abstractmethod
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+    import msvcrt
+
+
+class TokenStore(ABC):
+    """
+    A place where bearer tokens are kept so several OAuth2 objects, threads or processes can share one token.
+    Tokens are stored as dictionaries with 'key', 'bearer_token', 'token_expiration' (ISO 8601) and 'lifetime'
+    (seconds) entries.
+    """
+
+    @abstractmethod
+    def lock(self):
+        """
+        Returns a context manager that holds an exclusive lock on the store while a token is read and minted
+        :return: A context manager
+        """
+        pass
+
+    @abstractmethod
+    def load(self) -> dict:
+        """
+        Reads the stored token
+        :return: The stored token dictionary, or None if there is none
+        """
+        pass
+
+    @abstractmethod
+    def save(self, token: dict) -> None:
+        """
+        Replaces the stored token
+        :param token: The token dictionary to store
+        :return: None
+        """
+        pass
+
+
+class MemoryTokenStore(TokenStore):
+    def __init__(self):
+        """
+        A token store shared by the OAuth2 objects of a single process
+        """
+        self._lock = threading.Lock()
+        self._token = None
+
+    def lock(self):
+        return self._lock
+
+    def load(self) -> dict:
+        return self._token
+
+    def save(self, token: dict) -> None:
+        self._token = dict(token)
+
+
+class FileTokenStore(TokenStore):
+    def __init__(self, path: str):
+        """
+        A token store backed by a JSON file guarded by an OS file lock, letting every worker process on a host
+        share a single token.  The file is only readable by its owner.
+        :param path: The path of the token file.  A sibling file with a .lock suffix is used for locking.
+        """
+        self._path = path
+        self._lock_path = f'{path}.lock'
+
+    @contextlib.contextmanager
+    def lock(self):
+        with open(self._lock_path, 'a+b') as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            else:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+                else:
+                    lock_file.seek(0)
+                    msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+
+    def load(self) -> dict:
+        try:
+            with open(self._path, 'r') as token_file:
+                return json.load(token_file)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def save(self, token: dict) -> None:
+        directory = os.path.dirname(os.path.abspath(self._path))
+        file_descriptor, temp_path = tempfile.mkstemp(dir=directory)
+        try:
+            with os.fdopen(file_descriptor, 'w') as token_file:
+                json.dump(token, token_file)
+            os.chmod(temp_path, 0o600)
+            os.replace(temp_path, self._path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
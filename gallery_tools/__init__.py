@@ -0,0 +1,3 @@
+from .backup import PackageBackup
+from .mirror import InventoryMirror
+from .monitor import JobEvent, JobMonitor
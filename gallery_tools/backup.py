@@ -0,0 +1,185 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from datetime import datetime, timezone
+
+from api_v1.admin import Admin
+from api_v1.packages import DEFAULT_CHUNK_SIZE, PackageIntegrityError, download_package
+from .records import GALLERY_DATE_FORMAT, first_field, workflow_modified, workflow_version
+
+MANIFEST_NAME = 'manifest.json'
+
+
+def _extract_package(package_path: str, save_path: str) -> str:
+    # Module level so it can run in a worker process.  The package is extracted next to save_path and moved into
+    # place once complete, so an interrupted extraction never looks finished.
+    parent = os.path.dirname(save_path)
+    os.makedirs(parent, exist_ok=True)
+    temp_path = tempfile.mkdtemp(prefix=f'.{os.path.basename(save_path)}-', dir=parent)
+    try:
+        with zipfile.ZipFile(package_path) as zipped_package:
+            zipped_package.extractall(temp_path)
+        if not os.path.isdir(save_path):
+            os.replace(temp_path, save_path)
+    finally:
+        if os.path.isdir(temp_path):
+            shutil.rmtree(temp_path, ignore_errors=True)
+    return save_path
+
+
+class PackageBackup:
+    def __init__(self, admin: Admin, destination: str, max_workers: int = 8, extract: bool = False,
+                 extract_workers: int = None, chunk_size: int = DEFAULT_CHUNK_SIZE):
+        """
+        Backs up the package of every workflow in a Gallery.  Packages are stored once per content hash under
+        objects/, and manifest.json maps every app id to its hash, version and modification date.  Apps whose
+        version and modification date are unchanged since the previous run are not downloaded again.
+        :param admin: An Admin object used to list workflows and download packages
+        :param destination: The directory holding the backup
+        :param max_workers: The number of packages downloaded at once
+        :param extract: When True, every package is also extracted under extracted/, and apps whose extraction is
+        missing are not considered up to date
+        :param extract_workers: The number of processes used for extraction, defaulting to the number of CPUs
+        :param chunk_size: The number of bytes read from the connection at a time
+        """
+        self._admin = admin
+        self._destination = destination
+        self._max_workers = max_workers
+        self._extract = extract
+        self._extract_workers = extract_workers
+        self._chunk_size = chunk_size
+        self._store_lock = threading.Lock()
+
+    @property
+    def manifest_path(self) -> str:
+        return os.path.join(self._destination, MANIFEST_NAME)
+
+    def object_path(self, sha256: str) -> str:
+        return os.path.join(self._destination, 'objects', sha256[:2], f'{sha256}.yxzp')
+
+    def extracted_path(self, sha256: str) -> str:
+        return os.path.join(self._destination, 'extracted', sha256)
+
+    def load_manifest(self) -> dict:
+        try:
+            with open(self.manifest_path, 'r') as manifest_file:
+                return json.load(manifest_file)
+        except FileNotFoundError:
+            return {}
+
+    def _save_manifest(self, manifest: dict) -> None:
+        file_descriptor, temp_path = tempfile.mkstemp(dir=self._destination)
+        with os.fdopen(file_descriptor, 'w') as manifest_file:
+            json.dump(manifest, manifest_file, indent=2, sort_keys=True)
+        os.replace(temp_path, self.manifest_path)
+
+    def _is_current(self, entry: dict, workflow: dict) -> bool:
+        return (entry is not None
+                and entry.get('version') == workflow_version(workflow)
+                and entry.get('modified') == workflow_modified(workflow)
+                and os.path.isfile(self.object_path(entry['sha256']))
+                and (not self._extract or os.path.isdir(self.extracted_path(entry['sha256']))))
+
+    def _backup_package(self, app_id: str, workflow: dict) -> tuple:
+        """
+        Downloads one package into a partial file, which lets an interrupted run resume as long as the app has not
+        changed since, checks the archive, then moves it into the content-addressed store unless an identical
+        package is already there
+        :return: A tuple of the package hash and whether it was newly stored
+        """
+        partial_path = os.path.join(self._destination, 'partial', f'{app_id}.part')
+        version = json.dumps([workflow_version(workflow), workflow_modified(workflow)])
+        with download_package(self._admin.get_package, app_id, download_path=partial_path,
+                              chunk_size=self._chunk_size, version=version) as package_file:
+            digest = hashlib.sha256()
+            for chunk in iter(lambda: package_file.read(self._chunk_size), b''):
+                digest.update(chunk)
+
+            try:
+                with zipfile.ZipFile(package_file) as zipped_package:
+                    corrupt_member = zipped_package.testzip()
+            except zipfile.BadZipFile as error:
+                corrupt_member = error
+        sha256 = digest.hexdigest()
+
+        if corrupt_member is not None:
+            os.unlink(partial_path)
+            raise PackageIntegrityError(f'Package {app_id} is not a valid archive: {corrupt_member}')
+
+        object_path = self.object_path(sha256)
+        with self._store_lock:
+            if os.path.isfile(object_path):
+                os.unlink(partial_path)
+                return sha256, False
+
+            os.makedirs(os.path.dirname(object_path), exist_ok=True)
+            os.replace(partial_path, object_path)
+        return sha256, True
+
+    def run(self, params=None) -> dict:
+        """
+        Runs one backup
+        :param params: Optional parameters passed to get_all_workflows, e.g. a date filter
+        :return: A summary with the number of packages downloaded, stored, skipped and extracted, and the failures per app id
+        """
+        os.makedirs(os.path.join(self._destination, 'partial'), exist_ok=True)
+        response = self._admin.get_all_workflows(params=params)
+        response.raise_for_status()
+        workflows = {workflow['id']: workflow for workflow in response.json()}
+
+        manifest = self.load_manifest()
+        pending = [app_id for app_id, workflow in workflows.items() if not self._is_current(manifest.get(app_id), workflow)]
+        summary = {'workflows': len(workflows), 'skipped': len(workflows) - len(pending), 'downloaded': 0,
+                   'stored': 0, 'extracted': 0, 'failed': {}}
+
+        extractor = ProcessPoolExecutor(max_workers=self._extract_workers) if self._extract else None
+        extractions = {}
+        extracted_apps = {}
+        try:
+            with ThreadPoolExecutor(max_workers=self._max_workers) as downloader:
+                downloads = {downloader.submit(self._backup_package, app_id, workflows[app_id]): app_id
+                             for app_id in pending}
+                for future in as_completed(downloads):
+                    app_id = downloads[future]
+                    try:
+                        sha256, stored = future.result()
+                    except Exception as error:
+                        summary['failed'][app_id] = repr(error)
+                        continue
+
+                    workflow = workflows[app_id]
+                    manifest[app_id] = {
+                        'sha256': sha256,
+                        'name': first_field(workflow, 'name', 'metaInfo.name', 'fileName'),
+                        'version': workflow_version(workflow),
+                        'modified': workflow_modified(workflow),
+                        'backed_up_at': datetime.now(timezone.utc).strftime(GALLERY_DATE_FORMAT)
+                    }
+                    summary['downloaded'] += 1
+                    summary['stored'] += stored
+                    if (extractor is not None and sha256 not in extractions
+                            and not os.path.isdir(self.extracted_path(sha256))):
+                        extractions[sha256] = extractor.submit(_extract_package, self.object_path(sha256),
+                                                               self.extracted_path(sha256))
+                    extracted_apps.setdefault(sha256, []).append(app_id)
+
+            for sha256, extraction in extractions.items():
+                try:
+                    extraction.result()
+                except Exception as error:
+                    # The apps are left out of date, as extracted/ is missing, so the next run extracts them again
+                    for app_id in extracted_apps[sha256]:
+                        summary['failed'][app_id] = repr(error)
+                    continue
+                summary['extracted'] += 1
+        finally:
+            if extractor is not None:
+                extractor.shutdown()
+            self._save_manifest(manifest)
+
+        return summary
@@ -0,0 +1,247 @@
+import json
+import sqlite3
+import threading
+from datetime import datetime, timezone
+from typing import List
+
+from api_v1.admin import Admin
+from .records import GALLERY_DATE_FORMAT, first_field, normalize_date, workflow_modified, workflow_version
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS workflows (
+    id TEXT PRIMARY KEY,
+    name TEXT,
+    owner_id TEXT,
+    subscription_id TEXT,
+    version TEXT,
+    modified TEXT,
+    payload TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS workflows_owner ON workflows (owner_id);
+CREATE INDEX IF NOT EXISTS workflows_subscription ON workflows (subscription_id);
+CREATE INDEX IF NOT EXISTS workflows_modified ON workflows (modified);
+
+CREATE TABLE IF NOT EXISTS users (
+    id TEXT PRIMARY KEY,
+    email TEXT,
+    name TEXT,
+    payload TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS users_email ON users (email);
+
+CREATE TABLE IF NOT EXISTS schedules (
+    id TEXT PRIMARY KEY,
+    workflow_id TEXT,
+    owner_id TEXT,
+    payload TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS schedules_workflow ON schedules (workflow_id);
+
+CREATE TABLE IF NOT EXISTS collections (
+    id TEXT PRIMARY KEY,
+    name TEXT,
+    owner_id TEXT,
+    payload TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS collection_workflows (
+    collection_id TEXT NOT NULL,
+    workflow_id TEXT NOT NULL,
+    PRIMARY KEY (collection_id, workflow_id)
+);
+CREATE INDEX IF NOT EXISTS collection_workflows_workflow ON collection_workflows (workflow_id);
+
+CREATE TABLE IF NOT EXISTS sync_state (
+    entity TEXT PRIMARY KEY,
+    watermark TEXT,
+    synced_at TEXT NOT NULL
+);
+'''
+
+
+def _member_ids(collection: dict) -> List[str]:
+    members = first_field(collection, 'workflowIds', 'workflows', 'apps') or []
+    return [member.get('id') if isinstance(member, dict) else member for member in members]
+
+
+class InventoryMirror:
+    def __init__(self, admin: Admin, path: str = ':memory:'):
+        """
+        Keeps an indexed SQLite copy of a Gallery's workflows, users, schedules and collections so read-heavy
+        tooling can query it locally.  Workflows are synced incrementally using the startDate filter of
+        get_all_workflows and the newest modification date seen in the previous sync.
+        :param admin: An Admin object used to read the inventory
+        :param path: The SQLite database file, or ':memory:' for a mirror that lives only as long as this object
+        """
+        self._admin = admin
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.row_factory = sqlite3.Row
+        with self._connection:
+            self._connection.executescript(_SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self) -> None:
+        self._connection.close()
+
+    def _watermark(self, entity: str):
+        row = self._connection.execute('SELECT watermark FROM sync_state WHERE entity = ?', (entity,)).fetchone()
+        return row['watermark'] if row else None
+
+    def _mark_synced(self, entity: str, watermark) -> None:
+        self._connection.execute(
+            'INSERT OR REPLACE INTO sync_state (entity, watermark, synced_at) VALUES (?, ?, ?)',
+            (entity, watermark, datetime.now(timezone.utc).strftime(GALLERY_DATE_FORMAT)))
+
+    @staticmethod
+    def _fetch(response) -> list:
+        response.raise_for_status()
+        return response.json()
+
+    def sync_workflows(self, full: bool = False) -> int:
+        """
+        Pulls the workflows added or changed since the last sync
+        :param full: When True, every workflow is pulled again and workflows no longer on the server are removed
+        :return: The number of workflows written
+        """
+        watermark = None if full else self._watermark('workflows')
+        params = {'startDate': watermark} if watermark else None
+        workflows = self._fetch(self._admin.get_all_workflows(params=params))
+
+        rows = []
+        for workflow in workflows:
+            modified = workflow_modified(workflow)
+            rows.append((workflow['id'], first_field(workflow, 'name', 'metaInfo.name', 'fileName'),
+                         first_field(workflow, 'ownerId', 'owner.id'), first_field(workflow, 'subscriptionId'),
+                         workflow_version(workflow), modified, json.dumps(workflow)))
+            if modified is not None and (watermark is None or modified > watermark):
+                watermark = modified
+
+        with self._lock, self._connection:
+            if full:
+                self._connection.execute('DELETE FROM workflows')
+            self._connection.executemany('INSERT OR REPLACE INTO workflows VALUES (?, ?, ?, ?, ?, ?, ?)', rows)
+            self._mark_synced('workflows', watermark)
+        return len(rows)
+
+    def sync_users(self) -> int:
+        """
+        Replaces the mirrored users with the current users of the Gallery
+        :return: The number of users written
+        """
+        users = self._fetch(self._admin.get_users())
+        rows = [(user['id'], first_field(user, 'email'),
+                 ' '.join(part for part in (first_field(user, 'firstName'), first_field(user, 'lastName')) if part) or None,
+                 json.dumps(user)) for user in users]
+        return self._replace('users', rows)
+
+    def sync_schedules(self) -> int:
+        """
+        Replaces the mirrored schedules with the current schedules of the Gallery
+        :return: The number of schedules written
+        """
+        schedules = self._fetch(self._admin.get_schedules())
+        rows = [(schedule['id'], first_field(schedule, 'workflowId', 'appId'), first_field(schedule, 'ownerId', 'userId'),
+                 json.dumps(schedule)) for schedule in schedules]
+        return self._replace('schedules', rows)
+
+    def sync_collections(self) -> int:
+        """
+        Replaces the mirrored collections, and the workflows they contain, with the current ones of the Gallery
+        :return: The number of collections written
+        """
+        collections = self._fetch(self._admin.get_collections())
+        rows = [(collection['id'], first_field(collection, 'name'), first_field(collection, 'ownerId', 'owner.id'),
+                 json.dumps(collection)) for collection in collections]
+        members = [(collection['id'], workflow_id) for collection in collections
+                   for workflow_id in _member_ids(collection) if workflow_id]
+
+        with self._lock, self._connection:
+            self._connection.execute('DELETE FROM collection_workflows')
+            self._connection.executemany('INSERT OR IGNORE INTO collection_workflows VALUES (?, ?)', members)
+        return self._replace('collections', rows)
+
+    def _replace(self, table: str, rows: list) -> int:
+        placeholders = ', '.join('?' * len(rows[0])) if rows else ''
+        with self._lock, self._connection:
+            self._connection.execute(f'DELETE FROM {table}')
+            if rows:
+                self._connection.executemany(f'INSERT OR REPLACE INTO {table} VALUES ({placeholders})', rows)
+            self._mark_synced(table, None)
+        return len(rows)
+
+    def sync(self, full: bool = False) -> dict:
+        """
+        Syncs every mirrored entity
+        :param full: When True, workflows are pulled in full instead of since the last sync
+        :return: A dictionary with the number of records written per entity
+        """
+        return {
+            'workflows': self.sync_workflows(full=full),
+            'users': self.sync_users(),
+            'schedules': self.sync_schedules(),
+            'collections': self.sync_collections()
+        }
+
+    def _query(self, sql: str, parameters=()) -> List[dict]:
+        with self._lock:
+            rows = self._connection.execute(sql, parameters).fetchall()
+        return [json.loads(row['payload']) for row in rows]
+
+    def workflow(self, workflow_id: str):
+        """
+        :param workflow_id: The id of the workflow
+        :return: The mirrored workflow, or None
+        """
+        workflows = self._query('SELECT payload FROM workflows WHERE id = ?', (workflow_id,))
+        return workflows[0] if workflows else None
+
+    def workflows_by_owner(self, owner_id: str) -> List[dict]:
+        """
+        :param owner_id: The id of the owning user
+        :return: The mirrored workflows owned by the user
+        """
+        return self._query('SELECT payload FROM workflows WHERE owner_id = ? ORDER BY name', (owner_id,))
+
+    def workflows_by_subscription(self, subscription_id: str) -> List[dict]:
+        """
+        :param subscription_id: The id of the subscription (studio)
+        :return: The mirrored workflows in the subscription
+        """
+        return self._query('SELECT payload FROM workflows WHERE subscription_id = ? ORDER BY name', (subscription_id,))
+
+    def workflows_in_collection(self, collection_id: str) -> List[dict]:
+        """
+        :param collection_id: The id of the collection
+        :return: The mirrored workflows shared in the collection
+        """
+        return self._query('SELECT w.payload FROM workflows w JOIN collection_workflows c ON c.workflow_id = w.id '
+                           'WHERE c.collection_id = ? ORDER BY w.name', (collection_id,))
+
+    def workflows_modified_since(self, since) -> List[dict]:
+        """
+        :param since: A datetime or ISO 8601 string
+        :return: The mirrored workflows modified after the given time, oldest first
+        """
+        return self._query('SELECT payload FROM workflows WHERE modified > ? ORDER BY modified',
+                           (normalize_date(since),))
+
+    def schedules_for_workflow(self, workflow_id: str) -> List[dict]:
+        """
+        :param workflow_id: The id of the workflow
+        :return: The mirrored schedules running the workflow
+        """
+        return self._query('SELECT payload FROM schedules WHERE workflow_id = ?', (workflow_id,))
+
+    def user_by_email(self, email: str):
+        """
+        :param email: The email address of the user
+        :return: The mirrored user, or None
+        """
+        users = self._query('SELECT payload FROM users WHERE email = ? COLLATE NOCASE', (email,))
+        return users[0] if users else None
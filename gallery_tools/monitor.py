@@ -0,0 +1,251 @@
+import asyncio
+import logging
+import threading
+from typing import Callable, List, NamedTuple, Optional
+
+from api_v1.admin import Admin
+from api_v1.jobs import Jobs
+from api_v1.models import first_field
+
+logger = logging.getLogger(__name__)
+
+QUEUED = 'queued'
+RUNNING = 'running'
+COMPLETED = 'completed'
+ERRORED = 'errored'
+
+_STATES = {
+    'queued': QUEUED,
+    'running': RUNNING,
+    'executing': RUNNING,
+    'completed': COMPLETED,
+    'error': ERRORED,
+    'failed': ERRORED,
+    'cancelled': ERRORED
+}
+
+
+def job_state(job: dict) -> Optional[str]:
+    """
+    Maps a job's Gallery status and disposition onto queued, running, completed or errored
+    :param job: A job returned by the Gallery
+    :return: The state, or None if the status is not recognised
+    """
+    state = _STATES.get(str(job.get('status', '')).lower())
+    if state == COMPLETED and str(job.get('disposition', '')).lower() in ('error', 'failed', 'cancelled'):
+        return ERRORED
+    return state
+
+
+class JobEvent(NamedTuple):
+    """
+    A change in the state of a job.  previous_state is None the first time a job is seen.
+    """
+    workflow_id: Optional[str]
+    job_id: str
+    state: str
+    previous_state: Optional[str]
+    job: dict
+
+
+class JobMonitor:
+    def __init__(self, admin: Admin, jobs: Jobs = None, min_interval: float = 1.0, max_interval: float = 60.0,
+                 params=None, emit_initial: bool = False):
+        """
+        Watches job states across a Gallery and emits only the changes.  Each poll of get_workflow_jobs is parsed
+        incrementally and compared with the last seen state, indexed by workflow id.  Individual jobs can also be
+        followed through Jobs.get_job.  The polling interval halves after a poll that saw changes and grows while
+        nothing changes.
+        :param admin: An Admin object used to poll get_workflow_jobs
+        :param jobs: An optional Jobs object, required only to follow individual jobs with watch_job
+        :param min_interval: The shortest number of seconds between polls
+        :param max_interval: The longest number of seconds between polls
+        :param params: Optional parameters passed to get_workflow_jobs
+        :param emit_initial: When True, the states found by the first poll are emitted as events too
+        """
+        self._admin = admin
+        self._jobs = jobs
+        self._min_interval = min_interval
+        self._max_interval = max_interval
+        self._params = params
+        self._emit_initial = emit_initial
+        self.interval = min_interval
+        self._workflow_states = {}
+        self._watched_jobs = {}
+        self._subscribers = []
+        self._primed = False
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def subscribe(self, callback: Callable[[JobEvent], None]) -> Callable[[], None]:
+        """
+        Registers a callback that receives every JobEvent
+        :param callback: A callable receiving a JobEvent
+        :return: A callable that unsubscribes the callback
+        """
+        with self._lock:
+            self._subscribers.append(callback)
+
+        def unsubscribe() -> None:
+            with self._lock:
+                if callback in self._subscribers:
+                    self._subscribers.remove(callback)
+
+        return unsubscribe
+
+    def watch_job(self, job_id: str) -> None:
+        """
+        Follows a single job with Jobs.get_job until it completes or errors
+        :param job_id: The id of the job
+        :return: None
+        """
+        if self._jobs is None:
+            raise ValueError('A Jobs object is required to watch individual jobs')
+        with self._lock:
+            self._watched_jobs.setdefault(job_id, None)
+
+    def _publish(self, events: List[JobEvent]) -> None:
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for event in events:
+            for subscriber in subscribers:
+                try:
+                    subscriber(event)
+                except Exception:
+                    logger.exception('Job monitor subscriber %r failed', subscriber)
+
+    def _poll_workflows(self) -> List[JobEvent]:
+        # States are only recorded once the whole response has been read, so a failed poll loses no changes
+        events = []
+        states = {}
+        for item in self._admin.iter_workflow_jobs(params=self._params):
+            job = first_field(item, 'lastRunJob', 'lastJob', 'job')
+            if job is None and 'status' in item:
+                job, workflow_id = item, first_field(item, 'workflowId', 'appId')
+            else:
+                workflow_id = first_field(item, 'workflowId', 'appId', 'id')
+            if not job or not job.get('id'):
+                continue
+
+            state = job_state(job)
+            seen = (job['id'], state)
+            previous = states.get(workflow_id, self._workflow_states.get(workflow_id))
+            if previous == seen:
+                continue
+
+            states[workflow_id] = seen
+            same_job = previous is not None and previous[0] == job['id']
+            if self._primed or self._emit_initial:
+                events.append(JobEvent(workflow_id=workflow_id, job_id=job['id'], state=state,
+                                       previous_state=previous[1] if same_job else None, job=job))
+        self._workflow_states.update(states)
+        return events
+
+    def _poll_watched_jobs(self) -> List[JobEvent]:
+        events = []
+        with self._lock:
+            watched = dict(self._watched_jobs)
+        for job_id, previous_state in watched.items():
+            # Jobs are polled independently, so one failing job does not hold back the others
+            try:
+                response = self._jobs.get_job(job_id=job_id)
+                if response.status_code in (404, 410):
+                    logger.warning('Watched job %s no longer exists and is no longer watched', job_id)
+                    with self._lock:
+                        self._watched_jobs.pop(job_id, None)
+                    continue
+                response.raise_for_status()
+                job = response.json()
+            except Exception:
+                logger.exception('Polling watched job %s failed', job_id)
+                continue
+
+            state = job_state(job)
+            if state != previous_state:
+                events.append(JobEvent(workflow_id=first_field(job, 'appId', 'workflowId'), job_id=job_id,
+                                       state=state, previous_state=previous_state, job=job))
+            with self._lock:
+                if state in (COMPLETED, ERRORED):
+                    self._watched_jobs.pop(job_id, None)
+                elif job_id in self._watched_jobs:
+                    self._watched_jobs[job_id] = state
+        return events
+
+    def poll(self) -> List[JobEvent]:
+        """
+        Polls once, publishes the changes to the subscribers and adapts the polling interval.  Workflow changes are
+        published before individual jobs are polled, so they are delivered even if polling a watched job fails.
+        :return: The JobEvents found by this poll
+        """
+        events = self._poll_workflows()
+        self._primed = True
+        self._publish(events)
+
+        if self._jobs is not None:
+            job_events = self._poll_watched_jobs()
+            self._publish(job_events)
+            events += job_events
+
+        if events:
+            self.interval = max(self._min_interval, self.interval / 2)
+        else:
+            self.interval = min(self._max_interval, self.interval * 1.5)
+        return events
+
+    def run(self) -> None:
+        """
+        Polls until stop() is called.  Failed polls are logged and retried at the longest interval.
+        :return: None
+        """
+        self._stop.clear()
+        while not self._stop.is_set():
+            try:
+                self.poll()
+            except Exception:
+                logger.exception('Polling the Gallery for job changes failed')
+                self.interval = self._max_interval
+            self._stop.wait(self.interval)
+
+    def start(self) -> None:
+        """
+        Starts polling in a background thread
+        :return: None
+        """
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self.run, name='gallery-job-monitor', daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """
+        Stops the background thread started by start()
+        :return: None
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    async def events(self):
+        """
+        An async iterator over JobEvents for use on an event loop while the monitor polls in its background thread
+        :return: An async generator of JobEvents
+        """
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue()
+        unsubscribe = self.subscribe(lambda event: loop.call_soon_threadsafe(queue.put_nowait, event))
+        self.start()
+        try:
+            while True:
+                yield await queue.get()
+        finally:
+            unsubscribe()
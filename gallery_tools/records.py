@@ -0,0 +1,35 @@
+from datetime import datetime, timezone
+
+from api_v1.models import first_field
+
+# Format of the date filters accepted by the admin/v1 endpoints
+GALLERY_DATE_FORMAT = '%Y-%m-%dT%H:%M:%S'
+
+
+def normalize_date(value):
+    """
+    Converts a datetime or ISO 8601 string into a naive UTC string in GALLERY_DATE_FORMAT, which sorts chronologically
+    :param value: A datetime, an ISO 8601 string or None
+    :return: The normalized string, or None if the value is missing or unparseable
+    """
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        parsed = value
+    else:
+        try:
+            parsed = datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+        except ValueError:
+            return None
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed.strftime(GALLERY_DATE_FORMAT)
+
+
+def workflow_version(workflow: dict):
+    version = first_field(workflow, 'publishedVersionNumber', 'version')
+    return None if version is None else str(version)
+
+
+def workflow_modified(workflow: dict):
+    return normalize_date(first_field(workflow, 'dateModified', 'lastModified', 'uploadDate', 'dateCreated'))
@@ -5,4 +5,11 @@ class Method(Enum):
     GET = 'GET'
     PUT = 'PUT'
     POST = 'POST'
-    DELETE = 'DELETE'
\ No newline at end of file
+    DELETE = 'DELETE'
+
+    @property
+    def idempotent(self) -> bool:
+        """
+        Whether repeating the request has the same effect as sending it once, which makes it safe to retry
+        """
+        return self is not Method.POST